@@ -0,0 +1,286 @@
+"""Benchmark the Citibike supply pipeline against a local GraphQL stand-in.
+
+Serves a synthetic NYC-scale GetSupply payload from a local aiohttp server
+and measures the fetch, parse, normalise, lookup and sensor fan-out stages,
+reporting latency and peak memory for each.
+
+Run from the repository root in an environment with Home Assistant installed:
+
+    python benchmarks/bench_supply.py --stations 2200 --ebikes 6000
+"""
+
+import argparse
+import asyncio
+from collections.abc import Callable
+import gzip
+import json
+from pathlib import Path
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any
+
+from aiohttp import ClientSession, web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.citibike.cache import SupplySnapshot  # noqa: E402
+from custom_components.citibike.graphql_queries.get_supply_query import (  # noqa: E402
+    GET_SUPPLY_QUERY,
+)
+from custom_components.citibike.graphql_requests import (  # noqa: E402
+    clean_data,
+    fetch_graphql_data,
+    fetch_supply_data,
+)
+from custom_components.citibike.models import (  # noqa: E402
+    StationRecord,
+    StationView,
+)
+from custom_components.citibike.sensor import CitibikeSensor  # noqa: E402
+
+SENSOR_COUNTS = (1, 10, 50, 100, 500)
+
+
+def build_payload(stations: int, ebikes: int, seed: int) -> dict[str, Any]:
+    """Build a synthetic GetSupply response."""
+    rng = random.Random(seed)
+    now_ms = int(time.time() * 1000)
+    result = []
+    for index in range(stations):
+        result.append(
+            {
+                "stationName": f"Bench St {index} & {rng.randint(1, 200)} Ave",
+                "location": {
+                    "lat": 40.70 + rng.random() * 0.15,
+                    "lng": -74.02 + rng.random() * 0.12,
+                },
+                "siteId": f"{index}.{rng.randint(10, 99)}",
+                "totalBikesAvailable": 0,
+                "bikeDocksAvailable": rng.randint(0, 40),
+                "lastUpdatedMs": now_ms - rng.randint(0, 300_000),
+                "bikesAvailable": rng.randint(0, 20),
+                "ebikesAvailable": 0,
+                "isOffline": rng.random() < 0.01,
+                "totalRideablesAvailable": 0,
+                "ebikes": [],
+            }
+        )
+    for number in range(ebikes):
+        station = rng.choice(result)
+        station["ebikes"].append(
+            {
+                "rideableName": f"···{number:04d}",
+                "batteryStatus": {
+                    "percent": rng.randint(5, 100),
+                    "distanceRemaining": {
+                        "value": round(rng.uniform(1, 40), 1),
+                        "unit": "MILES",
+                    },
+                },
+            }
+        )
+    for station in result:
+        station["ebikesAvailable"] = len(station["ebikes"])
+        station["totalBikesAvailable"] = (
+            station["bikesAvailable"] + station["ebikesAvailable"]
+        )
+        station["totalRideablesAvailable"] = station["totalBikesAvailable"]
+    return {"data": {"supply": {"stations": result}}}
+
+
+async def start_server(body: bytes, compress: bool) -> tuple[web.AppRunner, str]:
+    """Serve the payload on a local port, standing in for a network endpoint."""
+    encoded = gzip.compress(body) if compress else body
+    headers = {"Content-Type": "application/json"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    async def handle(request: web.Request) -> web.Response:
+        await request.read()
+        return web.Response(body=encoded, headers=headers)
+
+    app = web.Application()
+    app.router.add_post("/bikesharefe-gql", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/bikesharefe-gql"
+
+
+class BenchCoordinator:
+    """Minimal stand-in for CitibikeCoordinator used by the fan-out stage."""
+
+    def __init__(self, snapshot: SupplySnapshot) -> None:
+        """Initialize the stand-in."""
+        self.data = snapshot
+        self.last_update_success = True
+        self._views: dict[str, StationView] = {}
+
+    def get_station(self, site_id: str | None, station_name: str):
+        """Return a station from the snapshot."""
+        return self.data.get_station(site_id, station_name)
+
+    def get_view(self, station: StationRecord) -> StationView:
+        """Return the memoised view of a station."""
+        view = self._views.get(station.site_id)
+        if view is None or view.record is not station:
+            view = self._views[station.site_id] = StationView.from_record(station)
+        return view
+
+
+async def measure(
+    name: str, func: Callable[[], Any], repeat: int, results: list[dict[str, Any]]
+) -> Any:
+    """Run a stage repeatedly and record its latency and peak memory."""
+
+    async def call() -> Any:
+        value = func()
+        if asyncio.iscoroutine(value):
+            value = await value
+        return value
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = await call()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # Tracing slows Python code down several times, so memory gets its own run
+    tracemalloc.start()
+    await call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    results.append(
+        {
+            "stage": name,
+            "median_ms": round(statistics.median(timings), 2),
+            "min_ms": round(min(timings), 2),
+            "peak_kib": round(peak / 1024, 1),
+        }
+    )
+    return value
+
+
+async def run(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """Run every benchmark stage."""
+    payload = build_payload(args.stations, args.ebikes, args.seed)
+    body = json.dumps(payload).encode()
+    stations = payload["data"]["supply"]["stations"]
+    tracked = {s["siteId"] for s in random.Random(args.seed).sample(stations, 40)}
+    query = {"query": GET_SUPPLY_QUERY, "variables": {"input": {}}}
+    results: list[dict[str, Any]] = []
+
+    runner, url = await start_server(body, args.gzip)
+    endpoint = SimpleNamespace(value=url)
+    try:
+        async with ClientSession() as session:
+            await measure(
+                "fetch full (read + json_loads)",
+                lambda: fetch_graphql_data(session, endpoint, query),
+                args.repeat,
+                results,
+            )
+            await measure(
+                "fetch streamed, all stations",
+                lambda: fetch_supply_data(session, endpoint, query),
+                args.repeat,
+                results,
+            )
+            await measure(
+                f"fetch streamed, {len(tracked)} tracked",
+                lambda: fetch_supply_data(session, endpoint, query, tracked),
+                args.repeat,
+                results,
+            )
+            loop = asyncio.get_running_loop()
+            await measure(
+                "fetch streamed, decoded in executor",
+                lambda: fetch_supply_data(
+                    session,
+                    endpoint,
+                    query,
+                    executor=lambda func, *a: loop.run_in_executor(None, func, *a),
+                ),
+                args.repeat,
+                results,
+            )
+    finally:
+        await runner.cleanup()
+
+    await measure(
+        "json.loads + clean_data",
+        lambda: clean_data(json.loads(body)),
+        args.repeat,
+        results,
+    )
+    records = await measure(
+        "normalise to StationRecord",
+        lambda: [StationRecord.from_dict(station) for station in stations],
+        args.repeat,
+        results,
+    )
+
+    def build_snapshot() -> SupplySnapshot:
+        snapshot = SupplySnapshot(timestamp=None, data=records)
+        snapshot.build_index()
+        return snapshot
+
+    snapshot = await measure(
+        "build snapshot index", build_snapshot, args.repeat, results
+    )
+    await measure(
+        "lookup every station",
+        lambda: [snapshot.get_station(r.site_id, r.name) for r in records],
+        args.repeat,
+        results,
+    )
+
+    coordinator = BenchCoordinator(snapshot)
+    for count in SENSOR_COUNTS:
+        sensors = [
+            CitibikeSensor(
+                {"id": record.name, "site_id": record.site_id, "network": "Citibike"},
+                coordinator,
+            )
+            for record in records[:count]
+        ]
+        await measure(
+            f"fan-out to {count} sensors",
+            lambda sensors=sensors: [s._update_from_station() for s in sensors],
+            args.repeat,
+            results,
+        )
+
+    return results
+
+
+def main() -> None:
+    """Parse arguments, run the benchmarks and print a report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=2200)
+    parser.add_argument("--ebikes", type=int, default=6000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--gzip", action="store_true", help="gzip the response")
+    parser.add_argument("--json", type=Path, help="also write results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    print(f"{'stage':<36}{'median ms':>12}{'min ms':>12}{'peak KiB':>12}")
+    for row in results:
+        print(
+            f"{row['stage']:<36}{row['median_ms']:>12}"
+            f"{row['min_ms']:>12}{row['peak_kib']:>12}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
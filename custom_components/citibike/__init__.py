@@ -6,23 +6,52 @@ from homeassistant.helpers.typing import ConfigType
 from homeassistant.helpers import config_validation as cv
 import voluptuous as vol
 
-from .const import DOMAIN
+from .cache import (
+    SensorDataCache,
+    acquire_network,
+    async_get_cache_store,
+    release_network,
+)
+from .const import DOMAIN, NetworkNames
+from .coordinator import async_get_coordinator
+from .services import async_setup_services
 
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the Citibike integration."""
+    async_setup_services(hass)
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Citibike from a config entry."""
+    acquire_network(NetworkNames(entry.data["network"]).name)
+    await async_get_cache_store(hass)
     await hass.config_entries.async_forward_entry_setups(entry, ["sensor"])
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
     return True
 
 
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Refetch with the new field selection when options change."""
+    network = NetworkNames(entry.data["network"])
+    SensorDataCache.invalidate(network.name)
+    await async_get_coordinator(hass, network).async_refresh()
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Unload a config entry."""
-    await hass.config_entries.async_forward_entry_unload(entry, "sensor")
+    """Unload a config entry, evicting its network when no other entry uses it."""
+    if not await hass.config_entries.async_forward_entry_unload(entry, "sensor"):
+        return False
+
+    network = NetworkNames(entry.data["network"])
+    if release_network(network.name):
+        coordinators = hass.data[DOMAIN].get("coordinators", {})
+        if (coordinator := coordinators.pop(network.name, None)) is not None:
+            await coordinator.async_shutdown()
+        store = await async_get_cache_store(hass)
+        store.async_schedule_station_save()
+        store.async_schedule_save()
     return True
@@ -0,0 +1,118 @@
+"""Zone availability aggregates for Citibike integration."""
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+import logging
+
+from homeassistant.core import HomeAssistant
+
+from .models import StationRecord
+from .spatial import StationIndex, haversine_km
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(slots=True, frozen=True)
+class Area:
+    """Circle around a zone whose stations are aggregated."""
+
+    latitude: float
+    longitude: float
+    radius_km: float
+
+    def contains(self, station: StationRecord) -> bool:
+        """Return True if the station lies inside the area."""
+        if station.latitude is None or station.longitude is None:
+            return False
+        distance = haversine_km(
+            self.latitude, self.longitude, station.latitude, station.longitude
+        )
+        return distance <= self.radius_km
+
+
+def zone_area(
+    hass: HomeAssistant, zone_entity_id: str, radius_m: float | None = None
+) -> Area | None:
+    """Return the area of a zone, optionally with another radius in metres."""
+    if (zone := hass.states.get(zone_entity_id)) is None:
+        return None
+    attributes = zone.attributes
+    if radius_m is None:
+        radius_m = attributes.get("radius", 0)
+    return Area(attributes["latitude"], attributes["longitude"], radius_m / 1000)
+
+
+class AreaAggregate:
+    """Running availability totals of the stations inside an area."""
+
+    def __init__(self, area: Area) -> None:
+        """Initialize empty totals."""
+        self.area = area
+        self._members: dict[str, StationRecord] = {}
+        self._ranges: dict[str, float] = {}
+        self.bikes = 0
+        self.ebikes = 0
+        self.docks = 0
+        self.distance_unit: str | None = None
+        # Bumped on every change so sensors can skip unchanged writes
+        self.version = 0
+
+    @property
+    def stations(self) -> int:
+        """Return the number of stations inside the area."""
+        return len(self._members)
+
+    @property
+    def max_ebike_range(self) -> float | None:
+        """Return the longest e-bike range of any station inside the area."""
+        return max(self._ranges.values(), default=None)
+
+    def rebuild(self, stations: dict[str, StationRecord], index: StationIndex) -> None:
+        """Recompute the members from the snapshot's spatial index."""
+        for site_id in list(self._members):
+            self._remove(site_id)
+        for _, indexed in index.within(
+            self.area.latitude, self.area.longitude, self.area.radius_km
+        ):
+            if (station := stations.get(indexed.site_id)) is not None:
+                self._add(station)
+        self.version += 1
+
+    def apply(self, changed: Iterable[StationRecord], removed: Iterable[str]) -> bool:
+        """Fold the changed and removed stations in, returning True on a change."""
+        updated = False
+        for site_id in removed:
+            if site_id in self._members:
+                self._remove(site_id)
+                updated = True
+        for station in changed:
+            inside = self.area.contains(station)
+            if station.site_id in self._members:
+                self._remove(station.site_id)
+                updated = True
+            if inside:
+                self._add(station)
+                updated = True
+        if updated:
+            self.version += 1
+        return updated
+
+    def _add(self, station: StationRecord) -> None:
+        """Add a station to the totals."""
+        self._members[station.site_id] = station
+        self.bikes += station.bikes_available
+        self.ebikes += station.ebikes_available
+        self.docks += station.docks_available or 0
+        if station.ebikes:
+            self._ranges[station.site_id] = max(
+                ebike.distance_remaining for ebike in station.ebikes
+            )
+            self.distance_unit = station.ebikes[0].distance_unit
+
+    def _remove(self, site_id: str) -> None:
+        """Remove a station from the totals."""
+        station = self._members.pop(site_id)
+        self.bikes -= station.bikes_available
+        self.ebikes -= station.ebikes_available
+        self.docks -= station.docks_available or 0
+        self._ranges.pop(site_id, None)
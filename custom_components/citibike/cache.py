@@ -1,12 +1,27 @@
 """Cache management for Citibike integration."""
 
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 import logging
-from typing import ClassVar
+from typing import Any, ClassVar
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, STATION_STORAGE_KEY, STORAGE_KEY, STORAGE_VERSION
+from .models import StationRecord
+from .spatial import StationIndex
 
 _LOGGER = logging.getLogger(__name__)
 
+# Seconds to batch snapshot writes before saving them to storage. A snapshot
+# changes on every poll, pending writes are flushed when Home Assistant stops.
+SAVE_DELAY = 600
+
+# Seconds to batch station list writes, the lists change every few hours
+STATION_SAVE_DELAY = 30
+
 
 @dataclass
 class CacheData:
@@ -16,75 +31,357 @@ class CacheData:
     data: list[dict[str, any]]
 
 
-class StationCache:
+@dataclass
+class SupplySnapshot(CacheData):
+    """Class to hold an indexed supply snapshot."""
+
+    data: list[StationRecord]
+    by_site_id: dict[str, StationRecord] = field(default_factory=dict)
+    by_name: dict[str, StationRecord] = field(default_factory=dict)
+    spatial: StationIndex | None = None
+    stale: bool = False
+
+    def build_index(self) -> None:
+        """Index stations by siteId, stationName and position."""
+        self.by_site_id = {s.site_id: s for s in self.data}
+        self.by_name = {s.name: s for s in self.data}
+        self.spatial = StationIndex.from_records(self.data)
+
+    def get_station(
+        self, site_id: str | None = None, station_name: str | None = None
+    ) -> StationRecord | None:
+        """Return a station by siteId, falling back to its name."""
+        if site_id is not None and (station := self.by_site_id.get(site_id)):
+            return station
+        if station_name is not None:
+            return self.by_name.get(station_name)
+        return None
+
+
+# Reference counts of the config entries using each network
+_network_refs: dict[str, int] = {}
+
+
+def acquire_network(network_name: str) -> None:
+    """Pin a network's caches while a config entry uses it."""
+    _network_refs[network_name] = _network_refs.get(network_name, 0) + 1
+
+
+def release_network(network_name: str) -> bool:
+    """Unpin a network, evicting its caches when no entry uses it anymore."""
+    refs = _network_refs.get(network_name, 0) - 1
+    if refs > 0:
+        _network_refs[network_name] = refs
+        return False
+    _network_refs.pop(network_name, None)
+    StationCache.evict(network_name)
+    SensorDataCache.evict(network_name)
+    return True
+
+
+def network_refs(network_name: str) -> int:
+    """Return the number of config entries using a network."""
+    return _network_refs.get(network_name, 0)
+
+
+class NetworkCache:
+    """Per-network cache bounded by entry count and age."""
+
+    _cache: ClassVar[OrderedDict[str, CacheData]]
+    LOG_TAG: ClassVar[str]
+    # Unreferenced networks beyond this count are evicted, least recently used first
+    MAX_ENTRIES: ClassVar[int] = 3
+    MAX_AGE: ClassVar[timedelta]
+
+    @classmethod
+    def _get(cls, network_name: str) -> CacheData | None:
+        """Return a network's entry if it has not outlived MAX_AGE."""
+        if (cached := cls._cache.get(network_name)) is None:
+            return None
+        if datetime.now() - cached.timestamp >= cls.MAX_AGE:
+            cls.evict(network_name)
+            return None
+        cls._cache.move_to_end(network_name)
+        return cached
+
+    @classmethod
+    def _put(cls, network_name: str, cached: CacheData) -> None:
+        """Store a network's entry and enforce the bounds on the others."""
+        cls._cache[network_name] = cached
+        cls._cache.move_to_end(network_name)
+
+        now = datetime.now()
+        for name, entry in list(cls._cache.items()):
+            if now - entry.timestamp >= cls.MAX_AGE:
+                cls.evict(name)
+
+        # Networks used by a config entry are pinned
+        excess = len(cls._cache) - cls.MAX_ENTRIES
+        if excess > 0:
+            unpinned = [
+                name
+                for name in cls._cache
+                if name != network_name and not network_refs(name)
+            ]
+            for name in unpinned[:excess]:
+                cls.evict(name)
+
+    @classmethod
+    def _restore(cls, network_name: str, cached: CacheData) -> None:
+        """Store a persisted entry unless it has outlived MAX_AGE."""
+        # Entries are restored before their config entries pin them, so the
+        # count bound is left to the next update
+        if datetime.now() - cached.timestamp < cls.MAX_AGE:
+            cls._cache[network_name] = cached
+
+    @classmethod
+    def evict(cls, network_name: str) -> bool:
+        """Drop a network's entry, returning True if there was one."""
+        if cls._cache.pop(network_name, None) is None:
+            return False
+        _LOGGER.debug("[%s] EVICT - Network: %s", cls.LOG_TAG, network_name)
+        return True
+
+    @classmethod
+    def flush(cls) -> None:
+        """Drop every entry."""
+        for network_name in list(cls._cache):
+            cls.evict(network_name)
+
+    @classmethod
+    def get_all(cls) -> dict[str, CacheData]:
+        """Return every cached network, valid or not."""
+        return dict(cls._cache)
+
+
+class StationCache(NetworkCache):
     """Cache manager for station configuration data."""
 
-    _cache: ClassVar[dict[str, CacheData]] = {}
+    _cache: ClassVar[OrderedDict[str, CacheData]] = OrderedDict()
+    _index: ClassVar[dict[str, StationIndex]] = {}
+    LOG_TAG: ClassVar[str] = "Station Cache"
     TIMEOUT: ClassVar[timedelta] = timedelta(hours=6)
+    # Station lists are only served while valid
+    MAX_AGE: ClassVar[timedelta] = TIMEOUT
 
     @classmethod
     def get_cached_data(cls, network_name: str) -> list[dict[str, any]] | None:
         """Get cached station data if valid."""
-        if (
-            network_name in cls._cache
-            and datetime.now() - cls._cache[network_name].timestamp < cls.TIMEOUT
-        ):
+        if (cached := cls._get(network_name)) is not None:
             _LOGGER.debug(
                 "[Station Cache] HIT - Network: %s - Stations: %d",
                 network_name,
-                len(cls._cache[network_name].data),
+                len(cached.data),
             )
-            return cls._cache[network_name].data
+            return cached.data
 
         _LOGGER.debug("[Station Cache] MISS - Network: %s", network_name)
         return None
 
+    @classmethod
+    def get_cached_index(cls, network_name: str) -> StationIndex | None:
+        """Get the spatial index of the cached stations if valid."""
+        if cls.get_cached_data(network_name) is None:
+            return None
+        return cls._index.get(network_name)
+
     @classmethod
     def update_cache(cls, network_name: str, data: list[dict[str, any]]) -> None:
-        """Update station cache with new data."""
-        cls._cache[network_name] = CacheData(
-            timestamp=datetime.now(),
-            data=data,
-        )
+        """Update station cache with new data and rebuild its spatial index."""
+        cls._index[network_name] = StationIndex.from_stations(data)
+        cls._put(network_name, CacheData(timestamp=datetime.now(), data=data))
         _LOGGER.debug(
             "[Station Cache] UPDATE - Network: %s - Stations: %d",
             network_name,
             len(data),
         )
 
+    @classmethod
+    def restore_cache(
+        cls, network_name: str, timestamp: datetime, data: list[dict[str, any]]
+    ) -> None:
+        """Restore persisted station data with its original timestamp."""
+        cls._restore(network_name, CacheData(timestamp=timestamp, data=data))
+        if network_name in cls._cache:
+            cls._index[network_name] = StationIndex.from_stations(data)
+
+    @classmethod
+    def evict(cls, network_name: str) -> bool:
+        """Drop a network's station data and spatial index."""
+        cls._index.pop(network_name, None)
+        return super().evict(network_name)
+
 
-class SensorDataCache:
+class SensorDataCache(NetworkCache):
     """Cache manager for sensor update data."""
 
-    _cache: ClassVar[dict[str, CacheData]] = {}
+    _cache: ClassVar[OrderedDict[str, SupplySnapshot]] = OrderedDict()
+    _timeouts: ClassVar[dict[str, timedelta]] = {}
+    LOG_TAG: ClassVar[str] = "Sensor Cache"
     TIMEOUT: ClassVar[timedelta] = timedelta(minutes=5)
+    # Expired snapshots are still served while the API is down, up to this age
+    MAX_AGE: ClassVar[timedelta] = timedelta(days=1)
 
     @classmethod
-    def get_cached_data(cls, network_name: str) -> list[dict[str, any]] | None:
-        """Get cached sensor data if valid."""
-        if (
-            network_name in cls._cache
-            and datetime.now() - cls._cache[network_name].timestamp < cls.TIMEOUT
-        ):
+    def set_timeout(cls, network_name: str, timeout: timedelta) -> None:
+        """Set the validity of a network's snapshot to match its poll interval."""
+        cls._timeouts[network_name] = timeout
+
+    @classmethod
+    def get_cached_data(cls, network_name: str) -> SupplySnapshot | None:
+        """Get cached sensor snapshot if valid."""
+        timeout = cls._timeouts.get(network_name, cls.TIMEOUT)
+        snapshot = cls._get(network_name)
+        if snapshot is not None and datetime.now() - snapshot.timestamp < timeout:
             _LOGGER.debug(
                 "[Sensor Cache] HIT - Network: %s - Stations: %d",
                 network_name,
-                len(cls._cache[network_name].data),
+                len(snapshot.data),
             )
-            return cls._cache[network_name].data
+            return snapshot
 
         _LOGGER.debug("[Sensor Cache] MISS - Network: %s", network_name)
         return None
 
     @classmethod
-    def update_cache(cls, network_name: str, data: list[dict[str, any]]) -> None:
-        """Update sensor cache with new data."""
-        cls._cache[network_name] = CacheData(
-            timestamp=datetime.now(),
+    def update_cache(
+        cls,
+        network_name: str,
+        data: list[StationRecord],
+        timestamp: datetime | None = None,
+    ) -> SupplySnapshot:
+        """Update sensor cache with new data and index its stations."""
+        snapshot = SupplySnapshot(
+            timestamp=timestamp or datetime.now(),
             data=data,
         )
+        snapshot.build_index()
+        cls._put(network_name, snapshot)
         _LOGGER.debug(
             "[Sensor Cache] UPDATE - Network: %s - Stations: %d",
             network_name,
             len(data),
         )
+        return snapshot
+
+    @classmethod
+    def invalidate(cls, network_name: str) -> None:
+        """Expire a network's snapshot, keeping it to serve while the API is down."""
+        # The next successful fetch sets the timeout from the poll interval again
+        cls._timeouts[network_name] = timedelta(0)
+        if network_name in cls._cache:
+            _LOGGER.debug("[Sensor Cache] INVALIDATE - Network: %s", network_name)
+
+    @classmethod
+    def get_last_snapshot(cls, network_name: str) -> SupplySnapshot | None:
+        """Get the latest snapshot for a network even if it has expired."""
+        return cls._get(network_name)
+
+    @classmethod
+    def restore_cache(
+        cls, network_name: str, timestamp: datetime, data: list[StationRecord]
+    ) -> None:
+        """Restore a persisted snapshot with its original timestamp."""
+        snapshot = SupplySnapshot(timestamp=timestamp, data=data)
+        snapshot.build_index()
+        cls._restore(network_name, snapshot)
+
+    @classmethod
+    def evict(cls, network_name: str) -> bool:
+        """Drop a network's snapshot and its poll-derived timeout."""
+        cls._timeouts.pop(network_name, None)
+        return super().evict(network_name)
+
+    @classmethod
+    def get_all(cls) -> dict[str, SupplySnapshot]:
+        """Return every cached network, valid or not."""
+        return dict(cls._cache)
+
+
+class CacheStore:
+    """Persist the station and sensor caches through Home Assistant storage."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the cache store."""
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        # Station lists are large and rarely change, so they are saved apart
+        self._station_store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, STATION_STORAGE_KEY
+        )
+
+    async def async_load(self) -> None:
+        """Restore both caches from storage."""
+        stored = await self._store.async_load() or {}
+        if (stored_stations := await self._station_store.async_load()) is None:
+            # Station lists were saved with the snapshots before they had a store
+            stored_stations = stored
+            if "stations" in stored:
+                self.async_schedule_station_save()
+        stations = stored_stations.get("stations", {})
+
+        for network_name, cached in stations.items():
+            StationCache.restore_cache(
+                network_name,
+                datetime.fromisoformat(cached["timestamp"]),
+                cached["data"],
+            )
+        for network_name, cached in stored.get("supply", {}).items():
+            SensorDataCache.restore_cache(
+                network_name,
+                datetime.fromisoformat(cached["timestamp"]),
+                [StationRecord.from_dict(station) for station in cached["data"]],
+            )
+        _LOGGER.debug(
+            "[Cache Store] LOAD - Station networks: %d - Sensor networks: %d",
+            len(stations),
+            len(stored.get("supply", {})),
+        )
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Save the sensor snapshots after a delay."""
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_schedule_station_save(self) -> None:
+        """Save the station lists after a short delay."""
+        self._station_store.async_delay_save(
+            self._stations_to_save, STATION_SAVE_DELAY
+        )
+
+    @callback
+    def _stations_to_save(self) -> dict[str, Any]:
+        """Return the station lists in a JSON serialisable form."""
+        return {
+            "stations": {
+                network_name: {
+                    "timestamp": cached.timestamp.isoformat(),
+                    "data": cached.data,
+                }
+                for network_name, cached in StationCache.get_all().items()
+            }
+        }
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the sensor snapshots in a JSON serialisable form."""
+        return {
+            "supply": {
+                network_name: {
+                    "timestamp": snapshot.timestamp.isoformat(),
+                    "data": [station.to_dict() for station in snapshot.data],
+                }
+                for network_name, snapshot in SensorDataCache.get_all().items()
+            },
+        }
+
+
+async def async_get_cache_store(hass: HomeAssistant) -> CacheStore:
+    """Return the cache store, loading persisted caches on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "cache_store" not in domain_data:
+        store = CacheStore(hass)
+        domain_data["cache_store"] = store
+        domain_data["cache_store_loaded"] = hass.async_create_task(store.async_load())
+    await domain_data["cache_store_loaded"]
+    return domain_data["cache_store"]
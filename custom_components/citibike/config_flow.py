@@ -1,40 +1,116 @@
 """Config flow for Citibike integration."""
 
-from datetime import timedelta
 import logging
-from typing import ClassVar
 
-from haversine import haversine
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.core import callback
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv, selector
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from .cache import StationCache
+from .cache import StationCache, async_get_cache_store
 from .const import (
+    ATTRIBUTE_GROUPS,
+    CONF_AREA_RADIUS,
+    CONF_ATTRIBUTE_GROUPS,
+    CONF_DATA_SOURCE,
+    CONF_EVENT_MIN_BATTERY,
+    CONF_EVENT_MIN_RANGE,
+    CONF_QUIET_END,
+    CONF_QUIET_START,
+    CONF_RADIUS,
+    CONF_RIDEABLE_EVENTS,
+    CONF_SEARCH,
+    CONF_SITEID,
     CONF_STATIONID,
+    CONF_STATIONS,
+    CONF_ZONES,
+    DATA_SOURCES,
+    DEFAULT_ATTRIBUTE_GROUPS,
+    DEFAULT_DATA_SOURCE,
     DOMAIN,
+    STATION_LIST_LIMIT,
     NetworkGraphQLEndpoints,
     NetworkNames,
     NetworkRegion,
 )
+from .coordinator import entry_stations
 from .graphql_queries.get_init_station_query import GET_INIT_STATION_QUERY
 from .graphql_requests import fetch_graphql_data
+from .spatial import StationIndex
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def _home_coordinates(hass: HomeAssistant) -> tuple[float, float]:
+    """Return the coordinates of the home zone."""
+    home_zone = hass.states.get("zone.home")
+    return home_zone.attributes["latitude"], home_zone.attributes["longitude"]
+
+
+def _configured_stations(
+    hass: HomeAssistant, network: str, exclude_entry_id: str | None = None
+) -> set[str]:
+    """Return the stations tracked by the entries of a network."""
+    return {
+        station[CONF_STATIONID]
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.data.get("network") == network and entry.entry_id != exclude_entry_id
+        for station in entry_stations(entry)
+    }
+
+
+async def async_get_station_index(
+    hass: HomeAssistant, network: NetworkNames
+) -> StationIndex | None:
+    """Return the station index of a network, fetching the station list if needed."""
+    network_name = network.name
+
+    # Check station cache
+    if StationCache.get_cached_data(network_name):
+        return StationCache.get_cached_index(network_name)
+
+    _LOGGER.debug("[API] Fetching station list for network %s", network_name)
+    region_code = NetworkRegion[network_name].value
+
+    query = {
+        "query": GET_INIT_STATION_QUERY,
+        "variables": {"input": {"regionCode": region_code}},
+    }
+
+    data = await fetch_graphql_data(
+        async_get_clientsession(hass),
+        NetworkGraphQLEndpoints[network_name],
+        query,
+        executor=hass.async_add_executor_job,
+    )
+
+    if data.get("base") == "cannot_connect":
+        _LOGGER.warning("[API] Connection failed for network %s", network_name)
+        return None
+
+    stations = data["data"]["supply"]["stations"]
+    StationCache.update_cache(network_name, stations)
+    (await async_get_cache_store(hass)).async_schedule_station_save()
+    _LOGGER.debug(
+        "[Config] Found %d stations for network %s",
+        len(stations),
+        network_name,
+    )
+    return StationCache.get_cached_index(network_name)
+
+
 class CitibikeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Citibike."""
 
-    # Class level cache configuration
-    _stations_cache: ClassVar[dict[str, StationCache]] = {}
-    STATION_CACHE_TIMEOUT: ClassVar[timedelta] = timedelta(hours=6)
-
     def __init__(self) -> None:
         """Initialize the config flow."""
         self._config: dict = {}
-        self._stations: list[dict[str, str]] = []
+        self._index: StationIndex | None = None
+        self._site_ids: dict[str, str | None] = {}
+        self._search: str = ""
+        self._radius: float | None = None
 
     async def async_step_user(
         self, user_input: dict[str, any] | None = None
@@ -60,80 +136,93 @@ class CitibikeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     async def async_step_select_station(
         self, user_input: dict[str, any] | None = None
     ) -> config_entries.ConfigFlowResult:
-        """Handle the step to select a station within the selected network."""
-        _LOGGER.debug("Starting step to select a station")
+        """Handle the step to select stations within the selected network."""
+        _LOGGER.debug("Starting step to select stations")
         errors = {}
 
+        # Changing the search or radius refines the list instead of submitting
         if user_input is not None:
-            self._config[CONF_STATIONID] = user_input[CONF_STATIONID]
-            _LOGGER.debug("Station selected: %s", user_input[CONF_STATIONID])
-
-            # Check if the station ID is already configured
-            existing_entries = self._async_current_entries()
-            for entry in existing_entries:
-                if entry.data.get(CONF_STATIONID) == user_input[CONF_STATIONID]:
-                    errors["base"] = "already_configured"
-                    _LOGGER.debug(
-                        "Station ID %s is already configured",
-                        user_input[CONF_STATIONID],
-                    )
-                    break
-
-            # Set unique ID for the sensor name
-            await self.async_set_unique_id(
-                f"{self._config['network'].lower()}_{user_input[CONF_STATIONID].lower()}"
-            )
-            self._abort_if_unique_id_configured()
+            search = user_input.get(CONF_SEARCH, "").strip()
+            radius = user_input.get(CONF_RADIUS)
+            if search != self._search or radius != self._radius:
+                self._search = search
+                self._radius = radius
+                user_input = None
+            elif not user_input.get(CONF_STATIONS):
+                user_input = None
+
+        if user_input is not None:
+            selected = user_input[CONF_STATIONS]
+            network = self._config["network"]
+            _LOGGER.debug("Stations selected: %s", selected)
 
+            # Check if any of the stations is already configured
+            configured = _configured_stations(self.hass, network)
+            if already := [name for name in selected if name in configured]:
+                errors["base"] = "already_configured"
+                _LOGGER.debug("Stations %s are already configured", already)
+
+            # Entries have no unique ID, the stations they track change over time
             if not errors:
                 _LOGGER.debug(
-                    "Creating entry for network %s and station %s",
-                    self._config["network"],
-                    user_input[CONF_STATIONID],
+                    "Creating entry for network %s and stations %s",
+                    network,
+                    selected,
                 )
+                self._config[CONF_STATIONS] = [
+                    {CONF_STATIONID: name, CONF_SITEID: self._site_ids.get(name)}
+                    for name in selected
+                ]
                 return self.async_create_entry(
-                    title=f"{self._config['network']} {user_input[CONF_STATIONID]}",
+                    title=(
+                        f"{network} {selected[0]}"
+                        if len(selected) == 1
+                        else f"{network} ({len(selected)} stations)"
+                    ),
                     data=self._config,
                 )
 
         # Fetch stations if not already fetched
-        if not self._stations:
-            errors = await self._async_fetch_stations()
-
-        if errors:
-            return self.async_show_form(
-                step_id="select_station",
-                data_schema=vol.Schema({}),
-                errors=errors,
+        if self._index is None:
+            self._index = await async_get_station_index(
+                self.hass, NetworkNames(self._config["network"])
             )
+            if self._index is None:
+                return self.async_show_form(
+                    step_id="select_station",
+                    data_schema=vol.Schema({}),
+                    errors={"base": "cannot_connect"},
+                )
 
-        # Get home zone coordinates
-        home_zone = self.hass.states.get("zone.home")
-        home_lat = home_zone.attributes["latitude"]
-        home_lon = home_zone.attributes["longitude"]
-
-        # Calculate distance to home zone and sort stations
-        for station in self._stations:
-            station_lat = station["location"]["lat"]
-            station_lon = station["location"]["lng"]
-            station["distance"] = haversine(
-                (home_lat, home_lon), (station_lat, station_lon)
-            )
+        # Offer the nearest stations to the home zone matching the filters
+        home_lat, home_lon = _home_coordinates(self.hass)
+        nearest = self._index.nearest(
+            home_lat,
+            home_lon,
+            STATION_LIST_LIMIT,
+            radius_km=self._radius,
+            text=self._search,
+        )
+        if not nearest:
+            errors["base"] = "no_stations_found"
 
-        self._stations.sort(key=lambda x: x["distance"])
+        self._site_ids = {station.name: station.site_id for _, station in nearest}
 
-        # Create a dropdown list of stations
-        station_options = {
-            station["stationName"]: station["stationName"] for station in self._stations
+        # Create a multi-select list of stations
+        schema = {
+            vol.Optional(CONF_SEARCH, default=self._search): str,
+            vol.Optional(
+                CONF_RADIUS, description={"suggested_value": self._radius}
+            ): vol.All(vol.Coerce(float), vol.Range(min=0)),
         }
+        if self._site_ids:
+            schema[vol.Optional(CONF_STATIONS, default=[])] = cv.multi_select(
+                {name: name for name in self._site_ids}
+            )
 
         return self.async_show_form(
             step_id="select_station",
-            data_schema=vol.Schema(
-                {
-                    vol.Required(CONF_STATIONID): vol.In(station_options),
-                }
-            ),
+            data_schema=vol.Schema(schema),
             errors=errors,
         )
 
@@ -143,40 +232,6 @@ class CitibikeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Get the options flow for this handler."""
         return CitibikeOptionsFlowHandler(config_entry)
 
-    async def _async_fetch_stations(self) -> dict[str, str]:
-        """Fetch stations from the Citibike GraphQL API asynchronously."""
-        network = NetworkNames(self._config.get("network"))
-        network_name = network.name
-
-        # Check station cache
-        if cached_data := StationCache.get_cached_data(network_name):
-            self._stations = cached_data
-            return {}
-
-        _LOGGER.debug("[API] Fetching station list for network %s", network_name)
-        region_code = NetworkRegion[network_name].value
-
-        query = {
-            "query": GET_INIT_STATION_QUERY,
-            "variables": {"input": {"regionCode": region_code}},
-        }
-
-        data = await fetch_graphql_data(NetworkGraphQLEndpoints[network_name], query)
-
-        if data.get("base") == "cannot_connect":
-            _LOGGER.warning("[API] Connection failed for network %s", network_name)
-            return {"base": "cannot_connect"}
-
-        self._stations = data["data"]["supply"]["stations"]
-        StationCache.update_cache(network_name, self._stations)
-        _LOGGER.debug(
-            "[Config] Found %d stations for network %s",
-            len(self._stations),
-            network_name,
-        )
-
-        return {}
-
 
 class CitibikeOptionsFlowHandler(config_entries.OptionsFlow):
     """Handle Citibike options."""
@@ -184,10 +239,143 @@ class CitibikeOptionsFlowHandler(config_entries.OptionsFlow):
     def __init__(self, config_entry) -> None:
         """Initialize the options flow handler."""
         self.config_entry = config_entry
+        self._site_ids: dict[str, str | None] = {}
 
     async def async_step_init(self, user_input=None):
         """Manage the options."""
+        errors = {}
+
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            # Stations of another entry would collide in the entity registry
+            configured = _configured_stations(
+                self.hass,
+                self.config_entry.data["network"],
+                self.config_entry.entry_id,
+            )
+            if not user_input.get(CONF_STATIONS):
+                errors["base"] = "no_stations_selected"
+            elif already := [
+                name for name in user_input[CONF_STATIONS] if name in configured
+            ]:
+                errors["base"] = "already_configured"
+                _LOGGER.debug("Stations %s are already configured", already)
+            else:
+                user_input[CONF_STATIONS] = [
+                    {CONF_STATIONID: name, CONF_SITEID: self._site_ids.get(name)}
+                    for name in user_input[CONF_STATIONS]
+                ]
+                return self.async_create_entry(title="", data=user_input)
+
+        # Offer the tracked stations plus the nearest ones to add
+        current = entry_stations(self.config_entry)
+        self._site_ids = {
+            station[CONF_STATIONID]: station.get(CONF_SITEID) for station in current
+        }
+        index = await async_get_station_index(
+            self.hass, NetworkNames(self.config_entry.data["network"])
+        )
+        if index is not None:
+            home_lat, home_lon = _home_coordinates(self.hass)
+            for _, station in index.nearest(home_lat, home_lon, STATION_LIST_LIMIT):
+                self._site_ids.setdefault(station.name, station.site_id)
 
-        return self.async_show_form(step_id="init")
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_STATIONS,
+                        default=[station[CONF_STATIONID] for station in current],
+                    ): cv.multi_select({name: name for name in self._site_ids}),
+                    vol.Optional(
+                        CONF_ATTRIBUTE_GROUPS,
+                        default=self.config_entry.options.get(
+                            CONF_ATTRIBUTE_GROUPS, DEFAULT_ATTRIBUTE_GROUPS
+                        ),
+                    ): cv.multi_select(ATTRIBUTE_GROUPS),
+                    vol.Optional(
+                        CONF_DATA_SOURCE,
+                        default=self.config_entry.options.get(
+                            CONF_DATA_SOURCE, DEFAULT_DATA_SOURCE
+                        ),
+                    ): vol.In(DATA_SOURCES),
+                    vol.Optional(
+                        CONF_QUIET_START,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                CONF_QUIET_START
+                            )
+                        },
+                    ): selector.TimeSelector(),
+                    vol.Optional(
+                        CONF_QUIET_END,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                CONF_QUIET_END
+                            )
+                        },
+                    ): selector.TimeSelector(),
+                    vol.Optional(
+                        CONF_ZONES,
+                        default=self.config_entry.options.get(CONF_ZONES, []),
+                    ): selector.EntitySelector(
+                        selector.EntitySelectorConfig(domain="zone", multiple=True)
+                    ),
+                    vol.Optional(
+                        CONF_AREA_RADIUS,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                CONF_AREA_RADIUS
+                            )
+                        },
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=50,
+                            max=5000,
+                            step=50,
+                            unit_of_measurement="m",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_RIDEABLE_EVENTS,
+                        default=self.config_entry.options.get(
+                            CONF_RIDEABLE_EVENTS, False
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_EVENT_MIN_BATTERY,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                CONF_EVENT_MIN_BATTERY
+                            )
+                        },
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0,
+                            max=100,
+                            step=5,
+                            unit_of_measurement="%",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_EVENT_MIN_RANGE,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                CONF_EVENT_MIN_RANGE
+                            )
+                        },
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0,
+                            max=100,
+                            step=1,
+                            unit_of_measurement="mi",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                }
+            ),
+            errors=errors,
+        )
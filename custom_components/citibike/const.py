@@ -4,7 +4,51 @@ from enum import Enum
 
 DOMAIN = "citibike"
 
+STORAGE_KEY = f"{DOMAIN}.cache"
+STATION_STORAGE_KEY = f"{DOMAIN}.stations"
+HISTORY_STORAGE_KEY = f"{DOMAIN}.history"
+STORAGE_VERSION = 1
+
 CONF_STATIONID = "id"
+CONF_SITEID = "site_id"
+CONF_STATIONS = "stations"
+CONF_ATTRIBUTE_GROUPS = "attribute_groups"
+CONF_QUIET_START = "quiet_start"
+CONF_QUIET_END = "quiet_end"
+CONF_SEARCH = "search"
+CONF_RADIUS = "radius"
+CONF_ZONES = "zones"
+CONF_AREA_RADIUS = "area_radius"
+CONF_DATA_SOURCE = "data_source"
+CONF_RIDEABLE_EVENTS = "rideable_events"
+CONF_EVENT_MIN_BATTERY = "event_min_battery"
+CONF_EVENT_MIN_RANGE = "event_min_range"
+
+SERVICE_INSPECT_CACHE = "inspect_cache"
+SERVICE_FLUSH_CACHE = "flush_cache"
+ATTR_NETWORK = "network"
+
+# Fired for each e-bike that arrives at, leaves or changes charge at a station
+EVENT_RIDEABLE_CHANGED = f"{DOMAIN}_rideable_changed"
+# Dispatcher signal with every e-bike change of one station, format with siteId
+SIGNAL_RIDEABLES_CHANGED = f"{DOMAIN}_rideables_changed_{{}}"
+
+# Number of nearest stations offered in the station dropdown
+STATION_LIST_LIMIT = 50
+
+# Optional attribute groups, station counts are always fetched
+ATTRIBUTE_GROUPS = {
+    "docks": "Dock and location info",
+    "ebike_battery": "Per e-bike battery detail",
+}
+DEFAULT_ATTRIBUTE_GROUPS = list(ATTRIBUTE_GROUPS)
+
+# Backends a network's supply can be polled from
+DATA_SOURCES = {
+    "graphql": "GraphQL, with per e-bike battery detail",
+    "gbfs": "GBFS, smaller conditional requests",
+}
+DEFAULT_DATA_SOURCE = "graphql"
 
 
 class NetworkNames(Enum):
@@ -25,6 +69,15 @@ class NetworkGraphQLEndpoints(Enum):
     BIKETOWN = "https://biketownpdx.com/bikesharefe-gql"
 
 
+class NetworkGBFSFeeds(Enum):
+    CITIBIKE = "https://gbfs.lyft.com/gbfs/2.3/bkn/en/"
+    BAYWHEELS = "https://gbfs.lyft.com/gbfs/2.3/bay/en/"
+    DIVVY = "https://gbfs.lyft.com/gbfs/2.3/chi/en/"
+    COGO = "https://gbfs.lyft.com/gbfs/2.3/cmh/en/"
+    CAPITALBIKESHARE = "https://gbfs.lyft.com/gbfs/2.3/dca/en/"
+    BIKETOWN = "https://gbfs.lyft.com/gbfs/2.3/pdx/en/"
+
+
 class NetworkRegion(Enum):
     CITIBIKE = "BKN"
     BAYWHEELS = "SFO"
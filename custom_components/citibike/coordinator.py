@@ -0,0 +1,672 @@
+"""Data update coordinator for Citibike integration."""
+
+import asyncio
+from collections.abc import Callable
+import dataclasses
+from datetime import datetime, timedelta
+import logging
+import time
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .areas import Area, AreaAggregate, zone_area
+from .cache import SensorDataCache, SupplySnapshot, async_get_cache_store
+from .const import (
+    CONF_AREA_RADIUS,
+    CONF_ATTRIBUTE_GROUPS,
+    CONF_DATA_SOURCE,
+    CONF_EVENT_MIN_BATTERY,
+    CONF_EVENT_MIN_RANGE,
+    CONF_QUIET_END,
+    CONF_QUIET_START,
+    CONF_RIDEABLE_EVENTS,
+    CONF_SITEID,
+    CONF_STATIONID,
+    CONF_STATIONS,
+    CONF_ZONES,
+    DEFAULT_ATTRIBUTE_GROUPS,
+    DEFAULT_DATA_SOURCE,
+    DOMAIN,
+    NetworkNames,
+)
+from .history import async_get_history_store
+from .metrics import FetchMetrics
+from .models import StationRecord, StationView
+from .resilience import RETRY_ATTEMPTS, CircuitBreaker, backoff_delay
+from .rideables import RideableFeed
+from .scheduler import (
+    CACHE_TTL_FACTOR,
+    MIN_SCAN_INTERVAL,
+    AdaptivePollScheduler,
+    in_quiet_hours,
+    request_budget,
+)
+from .sources import SOURCES, SupplySource
+
+_LOGGER = logging.getLogger(__name__)
+SCAN_INTERVAL = timedelta(minutes=5)
+
+# Larger station lists are normalised in the executor
+OFFLOAD_MIN_STATIONS = 100
+
+# Rideables requested per supply query at first, doubled while e-bikes are missing
+RIDEABLE_PAGE_LIMIT = 1000
+MAX_RIDEABLE_PAGE_LIMIT = 16000
+
+# Detail queries in flight at once across every network
+DETAIL_CONCURRENCY = 2
+_detail_slots = asyncio.Semaphore(DETAIL_CONCURRENCY)
+
+# Minutes of staleness that count toward a network's request priority
+MAX_STALE_MINUTES = 60
+
+
+def async_get_coordinator(
+    hass: HomeAssistant, network: NetworkNames
+) -> "CitibikeCoordinator":
+    """Return the shared coordinator for a network, creating it if needed."""
+    coordinators = hass.data.setdefault(DOMAIN, {}).setdefault("coordinators", {})
+    if (coordinator := coordinators.get(network.name)) is None:
+        _LOGGER.debug("[Coordinator] CREATE - Network: %s", network.name)
+        coordinator = coordinators[network.name] = CitibikeCoordinator(hass, network)
+    return coordinator
+
+
+def entry_stations(entry: ConfigEntry) -> list[dict[str, str | None]]:
+    """Return the stations tracked by an entry, newest configuration first."""
+    if CONF_STATIONS in entry.options:
+        return entry.options[CONF_STATIONS]
+    if CONF_STATIONS in entry.data:
+        return entry.data[CONF_STATIONS]
+    # Entries created before multi-station support track a single station
+    return [
+        {
+            CONF_STATIONID: entry.data[CONF_STATIONID],
+            CONF_SITEID: entry.data.get(CONF_SITEID),
+        }
+    ]
+
+
+def network_entries(hass: HomeAssistant, network: NetworkNames) -> list:
+    """Return the config entries tracking a station on a network."""
+    return [
+        entry
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.data.get("network") == network.value
+    ]
+
+
+class CitibikeCoordinator(DataUpdateCoordinator[SupplySnapshot]):
+    """Coordinate supply updates for every station of one network."""
+
+    def __init__(self, hass: HomeAssistant, network: NetworkNames) -> None:
+        """Initialize the coordinator."""
+        scheduler = AdaptivePollScheduler(network.name, SCAN_INTERVAL)
+        super().__init__(
+            hass,
+            _LOGGER,
+            config_entry=None,
+            name=f"{DOMAIN}_{network.name.lower()}",
+            update_interval=scheduler.initial_interval(),
+        )
+        self.network = network
+        self._scheduler = scheduler
+        self._service = GQLServiceData(hass, network, self._async_merge_snapshot)
+        self._background_refresh: asyncio.Task | None = None
+        self._views: dict[str, StationView] = {}
+        self._areas: dict[Area, AreaAggregate] = {}
+        self._area_users: dict[Area, int] = {}
+        self._rideable_feed = RideableFeed(hass, network.value)
+        self.has_live_data = False
+
+        # Serve the persisted snapshot until the first live fetch lands
+        self.data = SensorDataCache.get_last_snapshot(network.name)
+
+    async def _async_update_data(self) -> SupplySnapshot:
+        """Fetch the latest supply snapshot for the network."""
+        snapshot = await self._service.update()
+        if snapshot is None:
+            return self._serve_stale()
+        self.has_live_data = True
+        self._reschedule(snapshot)
+        self._apply_changes(snapshot)
+
+        # Drop the views of stations that left the snapshot
+        for site_id in self._views.keys() - snapshot.by_site_id.keys():
+            del self._views[site_id]
+        return snapshot
+
+    @callback
+    def _async_merge_snapshot(self, snapshot: SupplySnapshot) -> None:
+        """Publish a snapshot that gained e-bike detail after the update."""
+        self._apply_changes(snapshot)
+        self.data = snapshot
+        self.async_update_listeners()
+
+    def _apply_changes(self, snapshot: SupplySnapshot) -> None:
+        """Fold the stations changed since the last snapshot into areas and events."""
+        if snapshot is self.data:
+            return
+        # Only a source with e-bike detail has e-bikes to diff
+        if not self._service.has_detail:
+            self._rideable_feed.async_reset()
+        if self.data is None:
+            for aggregate in self._areas.values():
+                aggregate.rebuild(snapshot.by_site_id, snapshot.spatial)
+            if self._service.has_detail:
+                self._rideable_feed.async_publish(self._with_detail(snapshot.data), {})
+            return
+
+        # Unchanged stations keep their record, so identity finds the changes
+        previous = self.data.by_site_id
+        changed = [
+            station
+            for station in snapshot.data
+            if previous.get(station.site_id) is not station
+        ]
+        removed = previous.keys() - snapshot.by_site_id.keys()
+        if not changed and not removed:
+            return
+        if self._service.has_detail:
+            self._rideable_feed.async_discard(removed)
+            self._rideable_feed.async_publish(
+                self._with_detail(changed), self._rideable_thresholds()
+            )
+        if not self._areas:
+            return
+        _LOGGER.debug(
+            "[Areas] Network: %s - Changed: %d - Removed: %d",
+            self.network.name,
+            len(changed),
+            len(removed),
+        )
+        for aggregate in self._areas.values():
+            aggregate.apply(changed, removed)
+
+    def _with_detail(self, stations: list[StationRecord]) -> list[StationRecord]:
+        """Return the stations whose e-bikes are complete and up to date."""
+        # Stations awaiting detail still carry their last e-bikes
+        awaiting = self._service.awaiting_detail
+        return [
+            station
+            for station in stations
+            if station.site_id not in awaiting
+            and len(station.ebikes) >= station.ebikes_available
+        ]
+
+    def _rideable_thresholds(self) -> dict[str, tuple[float, float]]:
+        """Return the event thresholds of the stations whose entry fires events."""
+        return {
+            key: (
+                entry.options.get(CONF_EVENT_MIN_BATTERY) or 0,
+                entry.options.get(CONF_EVENT_MIN_RANGE) or 0,
+            )
+            for entry in network_entries(self.hass, self.network)
+            if entry.options.get(CONF_RIDEABLE_EVENTS)
+            for station in entry_stations(entry)
+            for key in (station.get(CONF_SITEID), station[CONF_STATIONID])
+            if key is not None
+        }
+
+    @callback
+    def async_track_area(self, area: Area) -> AreaAggregate:
+        """Return the shared aggregate of an area, seeding it from the snapshot."""
+        if (aggregate := self._areas.get(area)) is None:
+            aggregate = self._areas[area] = AreaAggregate(area)
+            if self.data is not None:
+                aggregate.rebuild(self.data.by_site_id, self.data.spatial)
+        self._area_users[area] = self._area_users.get(area, 0) + 1
+        return aggregate
+
+    @callback
+    def async_untrack_area(self, area: Area) -> None:
+        """Drop an area's aggregate once no sensor uses it."""
+        self._area_users[area] -= 1
+        if not self._area_users[area]:
+            del self._area_users[area]
+            del self._areas[area]
+
+    def _serve_stale(self) -> SupplySnapshot:
+        """Keep serving the last good snapshot and revalidate it soon."""
+        retry_after = self._service.breaker.retry_after or MIN_SCAN_INTERVAL
+        self.update_interval = self._scheduler.jittered(retry_after)
+
+        if (last := SensorDataCache.get_last_snapshot(self.network.name)) is None:
+            raise UpdateFailed(f"Connection failed for network {self.network.name}")
+        _LOGGER.warning(
+            "[Coordinator] STALE - Network: %s - Serving snapshot from %s, retry in %s",
+            self.network.name,
+            last.timestamp,
+            self.update_interval,
+        )
+        return dataclasses.replace(last, stale=True)
+
+    def _reschedule(self, snapshot: SupplySnapshot) -> None:
+        """Adapt the poll interval and cache TTL to the observed cadence."""
+        self._scheduler.observe(
+            snapshot.timestamp,
+            {station.site_id: station.last_updated_ms for station in snapshot.data},
+        )
+        self.update_interval = self._scheduler.next_interval(self._is_quiet())
+        SensorDataCache.set_timeout(
+            self.network.name, self.update_interval * CACHE_TTL_FACTOR
+        )
+
+    def _is_quiet(self) -> bool:
+        """Return True if every entry of the network is in its quiet hours."""
+        entries = network_entries(self.hass, self.network)
+        now = dt_util.now().time()
+        return bool(entries) and all(
+            in_quiet_hours(
+                now,
+                dt_util.parse_time(entry.options.get(CONF_QUIET_START) or ""),
+                dt_util.parse_time(entry.options.get(CONF_QUIET_END) or ""),
+            )
+            for entry in entries
+        )
+
+    @callback
+    def async_schedule_refresh(self, force: bool = False) -> None:
+        """Refresh in the background, once for every caller until it lands."""
+        if self._background_refresh is not None:
+            return
+        if force:
+            SensorDataCache.invalidate(self.network.name)
+        _LOGGER.debug(
+            "[Coordinator] REFRESH - Network: %s - Background", self.network.name
+        )
+        self._background_refresh = self.hass.async_create_task(self.async_refresh())
+        self._background_refresh.add_done_callback(self._clear_background_refresh)
+
+    def _clear_background_refresh(self, _task: asyncio.Task) -> None:
+        """Allow the next background refresh once this one completes."""
+        self._background_refresh = None
+
+    @property
+    def metrics(self) -> FetchMetrics:
+        """Return the fetch pipeline metrics of the network."""
+        return self._service.metrics
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """Return the circuit breaker of the network endpoint."""
+        return self._service.breaker
+
+    @property
+    def data_source(self) -> str:
+        """Return the name of the source the network is polled from."""
+        return self._service.source.name
+
+    def get_station(
+        self, site_id: str | None, station_name: str
+    ) -> StationRecord | None:
+        """Return a station from the latest snapshot by siteId or name."""
+        if self.data is None:
+            return None
+        return self.data.get_station(site_id, station_name)
+
+    def get_view(self, station: StationRecord) -> StationView:
+        """Return the derived view of a station, reusing it while unchanged."""
+        # Records are reused while lastUpdatedMs is unchanged, so identity suffices
+        view = self._views.get(station.site_id)
+        if view is None or view.record is not station:
+            view = self._views[station.site_id] = StationView.from_record(station)
+        return view
+
+
+class GQLServiceData:
+    """Query GQL API for Citibike data."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        network: NetworkNames,
+        on_detail: Callable[[SupplySnapshot], None],
+    ) -> None:
+        """Initialize the GQL Service Data."""
+        self._hass = hass
+        self._network = network
+        self._on_detail = on_detail
+        self._pending: asyncio.Task | None = None
+        self._detail_task: asyncio.Task | None = None
+        self._awaiting_detail: set[str] = set()
+        self._records: dict[str, StationRecord] = {}
+        self._record_key: tuple[str, set[str]] | None = None
+        # Last rideable page limit that returned every e-bike of the network
+        self._page_limit = RIDEABLE_PAGE_LIMIT
+        self.metrics = FetchMetrics()
+        self._sources: dict[str, SupplySource] = {}
+        self.source = self._get_source(DEFAULT_DATA_SOURCE)
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """Return the circuit breaker of the current source."""
+        return self.source.breaker
+
+    @property
+    def awaiting_detail(self) -> set[str]:
+        """Return the siteIds whose e-bike detail has not been merged yet."""
+        return self._awaiting_detail
+
+    @property
+    def has_detail(self) -> bool:
+        """Return True if the records carry per e-bike detail."""
+        return (
+            self._record_key is not None
+            and self.source.supports_detail
+            and "ebike_battery" in self._record_key[1]
+        )
+
+    def _get_source(self, name: str) -> SupplySource:
+        """Return the network's data source of a kind, creating it if needed."""
+        if (source := self._sources.get(name)) is None:
+            source = SOURCES[name](self._hass, self._network, self.metrics)
+            self._sources[name] = source
+        return source
+
+    def _data_source(self) -> str:
+        """Return the source every entry of the network selects, else GraphQL."""
+        entries = network_entries(self._hass, self._network)
+        if entries and all(
+            entry.options.get(CONF_DATA_SOURCE) == "gbfs" for entry in entries
+        ):
+            return "gbfs"
+        return DEFAULT_DATA_SOURCE
+
+    async def update(self) -> SupplySnapshot | None:
+        """Return the network stations, sharing one request between callers."""
+        if self._pending is None:
+            self._pending = self._hass.async_create_task(self._async_fetch())
+            self._pending.add_done_callback(self._clear_pending)
+        else:
+            _LOGGER.debug(
+                "[API] Joining in-flight request for network %s", self._network.name
+            )
+        return await asyncio.shield(self._pending)
+
+    def _clear_pending(self, _task: asyncio.Task) -> None:
+        """Forget the finished request so the next update fetches again."""
+        self._pending = None
+
+    def _tracked_stations(self) -> set[str] | None:
+        """Return the siteIds and names to keep, or None to keep every station."""
+        entries = network_entries(self._hass, self._network)
+        if not entries:
+            return None
+        return {
+            key
+            for entry in entries
+            for station in entry_stations(entry)
+            for key in (station.get(CONF_SITEID), station[CONF_STATIONID])
+            if key is not None
+        }
+
+    def _tracked_areas(self) -> list[Area]:
+        """Return the areas whose stations are kept besides the tracked ones."""
+        areas = []
+        for entry in network_entries(self._hass, self._network):
+            radius_m = entry.options.get(CONF_AREA_RADIUS)
+            for zone in entry.options.get(CONF_ZONES, []):
+                if (area := zone_area(self._hass, zone, radius_m)) is not None:
+                    areas.append(area)
+        return areas
+
+    def _priority(self) -> float:
+        """Rank the network by its tracked stations and the age of its data."""
+        stations = sum(
+            len(entry_stations(entry))
+            for entry in network_entries(self._hass, self._network)
+        )
+        stale_minutes = MAX_STALE_MINUTES
+        snapshot = SensorDataCache.get_last_snapshot(self._network.name)
+        if snapshot is not None:
+            age = (datetime.now() - snapshot.timestamp).total_seconds() / 60
+            stale_minutes = min(age, MAX_STALE_MINUTES)
+        return stations + stale_minutes
+
+    def _attribute_groups(self) -> set[str]:
+        """Return the attribute groups wanted by any entry of this network."""
+        entries = network_entries(self._hass, self._network)
+        if not entries:
+            return set(DEFAULT_ATTRIBUTE_GROUPS)
+        groups = {
+            group
+            for entry in entries
+            for group in entry.options.get(
+                CONF_ATTRIBUTE_GROUPS, DEFAULT_ATTRIBUTE_GROUPS
+            )
+        }
+        # Area sensors place stations by their location
+        if any(entry.options.get(CONF_ZONES) for entry in entries):
+            groups.add("docks")
+        return groups
+
+    async def _async_fetch(self) -> SupplySnapshot | None:
+        """Fetch the supply data, using the sensor cache when valid."""
+        network_name = self._network.name
+
+        # Check sensor data cache
+        if cached_data := SensorDataCache.get_cached_data(network_name):
+            self.metrics.cache_hits += 1
+            return cached_data
+        self.metrics.cache_misses += 1
+
+        self.source = self._get_source(self._data_source())
+        groups = self._attribute_groups()
+        _LOGGER.debug(
+            "[API] Fetching data for network %s from %s", network_name, self.source.name
+        )
+
+        # E-bikes come with the counts at the page limit that last sufficed, only
+        # stations it truncated are fetched again with a larger limit
+        detail = "ebike_battery" in groups and self.source.supports_detail
+        if self._detail_task is not None:
+            self._detail_task.cancel()
+
+        self.metrics.fetches += 1
+        if (data := await self._async_fetch_with_retry(groups)) is None:
+            self.metrics.failures += 1
+            return None
+
+        # Records only hold the selected fields of one source, so a change of
+        # either starts over
+        if (self.source.name, groups) != self._record_key:
+            self._records = {}
+            self._record_key = (self.source.name, groups)
+
+        raw_stations = data["data"]["supply"]["stations"]
+        blocking_ms = self.metrics.decode_blocking_ms or 0.0
+        if len(raw_stations) >= OFFLOAD_MIN_STATIONS:
+            stations, elapsed = await self._hass.async_add_executor_job(
+                self._normalise_all, raw_stations, detail
+            )
+        else:
+            stations, elapsed = self._normalise_all(raw_stations, detail)
+            blocking_ms += elapsed * 1000
+        self.metrics.normalise_ms = round(elapsed * 1000, 1)
+        self.metrics.station_count = len(stations)
+        reused = {
+            station.site_id
+            for station in stations
+            if self._records.get(station.site_id) is station
+        }
+        self.metrics.records_reused = len(reused)
+        self._records = {station.site_id: station for station in stations}
+
+        index_start = time.perf_counter()
+        snapshot = SensorDataCache.update_cache(network_name, stations)
+        blocking_ms += (time.perf_counter() - index_start) * 1000
+        self.metrics.loop_blocking_ms = round(blocking_ms, 1)
+
+        (await async_get_cache_store(self._hass)).async_schedule_save()
+
+        # Reused records have not reported since their last history sample
+        if (tracked := self._tracked_stations()) is not None:
+            (await async_get_history_store(self._hass)).async_record(
+                [
+                    station
+                    for station in stations
+                    if station.site_id not in reused
+                    and (station.site_id in tracked or station.name in tracked)
+                ]
+            )
+
+        # Unchanged stations kept their complete e-bikes, only changed stations the
+        # page limit cut short and those an earlier detail query missed need more
+        truncated = set()
+        if detail:
+            truncated = (
+                {
+                    station["siteId"]
+                    for station in raw_stations
+                    if len(station.get("ebikes") or ()) < station["ebikesAvailable"]
+                }
+                - reused
+            ) | (self._awaiting_detail & self._records.keys())
+        self._awaiting_detail = truncated
+        self.metrics.ebikes_truncated = len(truncated)
+        if truncated:
+            self._detail_task = self._hass.async_create_background_task(
+                self._async_fetch_detail(truncated, groups),
+                f"{DOMAIN}_{network_name.lower()}_detail",
+            )
+        return snapshot
+
+    async def _async_fetch_detail(self, site_ids: set[str], groups: set[str]) -> None:
+        """Fetch e-bike detail, raising the page limit while e-bikes are missing."""
+        network_name = self._network.name
+        page_limit = min(self._page_limit * 2, MAX_RIDEABLE_PAGE_LIMIT)
+        start = time.perf_counter()
+        self.metrics.detail_stations = len(site_ids)
+
+        while True:
+            # Detail waits behind the station counts of every network
+            async with (
+                _detail_slots,
+                request_budget.slot(network_name, -1) as queued,
+            ):
+                self.metrics.detail_queue_ms = round(queued * 1000, 1)
+                data = await self.source.async_fetch_detail(
+                    site_ids, groups, page_limit, self._merge_detail
+                )
+            if data.get("base") == "cannot_connect":
+                _LOGGER.warning(
+                    "[API] E-bike detail failed for network %s", network_name
+                )
+                return
+
+            truncated = {
+                site_id
+                for site_id in site_ids
+                if (station := self._records.get(site_id)) is not None
+                and len(station.ebikes) < station.ebikes_available
+            }
+            self.metrics.ebikes_truncated = len(truncated)
+            if not truncated or page_limit >= MAX_RIDEABLE_PAGE_LIMIT:
+                # Start the next supply query from the limit that sufficed
+                self._page_limit = page_limit
+                break
+            page_limit *= 2
+            site_ids = truncated
+            _LOGGER.debug(
+                "[API] E-bikes missing at %d stations of network %s, page limit %d",
+                len(truncated),
+                network_name,
+                page_limit,
+            )
+
+        self.metrics.detail_ms = round((time.perf_counter() - start) * 1000, 1)
+        (await async_get_cache_store(self._hass)).async_schedule_save()
+
+    @callback
+    def _merge_detail(self, stations: list[dict[str, any]]) -> None:
+        """Merge a batch of stations with e-bike detail into the snapshot."""
+        network_name = self._network.name
+        if (snapshot := SensorDataCache.get_last_snapshot(network_name)) is None:
+            return
+        merged = {}
+        for station in stations:
+            record = StationRecord.from_dict(station)
+            self._records[record.site_id] = merged[record.site_id] = record
+            self._awaiting_detail.discard(record.site_id)
+        # The snapshot stays as old as its fetch, so the poll interval, cache
+        # validity and staleness are not pushed back by late detail
+        snapshot = SensorDataCache.update_cache(
+            network_name,
+            [merged.get(station.site_id, station) for station in snapshot.data],
+            snapshot.timestamp,
+        )
+        self._on_detail(snapshot)
+
+    def _normalise_all(
+        self, stations: list[dict[str, any]], carry_ebikes: bool = False
+    ) -> tuple[list[StationRecord], float]:
+        """Normalise the stations, returning the records and the time taken."""
+        start = time.perf_counter()
+        records = [self._normalise(station, carry_ebikes) for station in stations]
+        return records, time.perf_counter() - start
+
+    def _normalise(
+        self, station: dict[str, any], carry_ebikes: bool = False
+    ) -> StationRecord:
+        """Return the station record, reusing the last one if it is unchanged."""
+        previous = self._records.get(station["siteId"])
+        if (
+            previous is not None
+            and previous.last_updated_ms == station["lastUpdatedMs"]
+        ):
+            return previous
+        record = StationRecord.from_dict(station)
+        # Keep showing the last e-bikes of a truncated station until the detail
+        # query replaces them
+        if (
+            carry_ebikes
+            and previous is not None
+            and previous.ebikes
+            and len(record.ebikes) < record.ebikes_available
+        ):
+            record = dataclasses.replace(record, ebikes=previous.ebikes)
+        return record
+
+    async def _async_fetch_with_retry(self, groups: set[str]) -> dict[str, any] | None:
+        """Fetch from the source with jittered backoff behind the circuit breaker."""
+        network_name = self._network.name
+        tracked = self._tracked_stations()
+        areas = self._tracked_areas()
+
+        for attempt in range(RETRY_ATTEMPTS):
+            if self.breaker.is_open:
+                _LOGGER.debug(
+                    "[API] Circuit open for network %s, retry in %s",
+                    network_name,
+                    self.breaker.retry_after,
+                )
+                return None
+
+            async with request_budget.slot(
+                network_name, self._priority()
+            ) as queued:
+                self.metrics.queue_ms = round(queued * 1000, 1)
+                data = await self.source.async_fetch(
+                    groups, tracked, areas, self._page_limit
+                )
+            if data.get("base") != "cannot_connect":
+                self.breaker.record_success()
+                return data
+
+            self.breaker.record_failure()
+            if attempt + 1 < RETRY_ATTEMPTS:
+                delay = backoff_delay(attempt)
+                _LOGGER.debug(
+                    "[API] Attempt %d failed for network %s, retrying in %.1fs",
+                    attempt + 1,
+                    network_name,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+
+        _LOGGER.warning("[API] Connection failed for network %s", network_name)
+        return None
@@ -0,0 +1,45 @@
+"""Diagnostics support for Citibike integration."""
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .cache import StationCache
+from .const import NetworkNames
+from .coordinator import async_get_coordinator
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = async_get_coordinator(hass, NetworkNames(entry.data["network"]))
+    snapshot = coordinator.data
+    stations = StationCache.get_all().get(coordinator.network.name)
+
+    return {
+        "entry": {"data": dict(entry.data), "options": dict(entry.options)},
+        "network": coordinator.network.name,
+        "data_source": coordinator.data_source,
+        "update_interval": str(coordinator.update_interval),
+        "last_update_success": coordinator.last_update_success,
+        "metrics": coordinator.metrics.as_dict(),
+        "circuit_breaker": {
+            "open": coordinator.breaker.is_open,
+            "retry_after": str(coordinator.breaker.retry_after),
+        },
+        "sensor_cache": None
+        if snapshot is None
+        else {
+            "timestamp": snapshot.timestamp.isoformat(),
+            "stations": len(snapshot.data),
+            "stale": snapshot.stale,
+        },
+        "station_cache": None
+        if stations is None
+        else {
+            "timestamp": stations.timestamp.isoformat(),
+            "stations": len(stations.data),
+        },
+    }
@@ -0,0 +1,64 @@
+"""Base entity for Citibike integration."""
+
+import logging
+
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import CONF_SITEID, CONF_STATIONID, NetworkNames
+from .coordinator import CitibikeCoordinator
+from .models import StationView
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CitibikeStationEntity(CoordinatorEntity[CitibikeCoordinator]):
+    """Entity that follows one station in the network snapshot."""
+
+    def __init__(self, config: dict, coordinator: CitibikeCoordinator) -> None:
+        """Initialize the entity."""
+        super().__init__(coordinator)
+        self._id = config[CONF_STATIONID]
+        self._site_id = config.get(CONF_SITEID)
+        self._network = NetworkNames(config["network"]).value
+
+        self._fingerprint = None
+        self._written_available = None
+        self._written_stale = None
+
+    @property
+    def _is_stale(self) -> bool:
+        """Return True while the coordinator serves a stale snapshot."""
+        return self.coordinator.data is not None and self.coordinator.data.stale
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle a new snapshot, writing state only if the station changed."""
+        station = self.coordinator.get_station(self._site_id, self._id)
+        if (
+            station is not None
+            and station.fingerprint == self._fingerprint
+            and self.available == self._written_available
+            and self._is_stale == self._written_stale
+        ):
+            _LOGGER.debug("Citibike entity %s unchanged, skipping write", self.name)
+            return
+        self._update_from_station()
+        self._written_available = self.available
+        self._written_stale = self._is_stale
+        super()._handle_coordinator_update()
+
+    def _update_from_station(self) -> bool:
+        """Update the entity from the coordinator snapshot if it has the station."""
+        _LOGGER.debug("Updating Citibike entity %s", self.name)
+        station = self.coordinator.get_station(self._site_id, self._id)
+        if station is None:
+            return False
+        self._fingerprint = station.fingerprint
+        self._site_id = station.site_id
+        self._apply_station(self.coordinator.get_view(station))
+        return True
+
+    def _apply_station(self, view: StationView) -> None:
+        """Copy the station values the entity exposes."""
+        raise NotImplementedError
@@ -0,0 +1,110 @@
+"""GBFS feed requests for Citibike integration."""
+
+from dataclasses import dataclass
+from enum import Enum
+import logging
+import time
+from typing import Any
+
+import aiohttp
+
+from homeassistant.util.json import json_loads
+
+from .graphql_requests import OFFLOAD_MIN_BYTES, REQUEST_TIMEOUT, Executor
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class FeedResult(Enum):
+    """Outcome of refreshing a GBFS feed."""
+
+    UPDATED = "updated"
+    NOT_MODIFIED = "not_modified"
+    # Within its ttl, no request was made
+    FRESH = "fresh"
+    FAILED = "failed"
+
+
+@dataclass
+class GBFSFeed:
+    """Last response of a GBFS feed and its validators."""
+
+    url: str
+    # Floor on the feed's own ttl, in seconds
+    min_ttl: int = 0
+    data: dict[str, Any] | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    ttl: int = 0
+    expires: float = 0.0
+    response_bytes: int = 0
+
+    @property
+    def is_fresh(self) -> bool:
+        """Return True while the feed is within its advertised ttl."""
+        return self.data is not None and time.monotonic() < self.expires
+
+    def update_expiry(self, last_updated: int | None) -> None:
+        """Keep the feed until last_updated + ttl, or at least min_ttl."""
+        remaining = self.ttl
+        if last_updated is not None:
+            remaining = last_updated + self.ttl - time.time()
+        self.expires = time.monotonic() + max(remaining, self.min_ttl, 0)
+
+
+async def fetch_gbfs_feed(
+    session: aiohttp.ClientSession,
+    feed: GBFSFeed,
+    executor: Executor | None = None,
+) -> FeedResult:
+    """Refresh a feed with a conditional request once its ttl has passed."""
+    feed.response_bytes = 0
+    if feed.is_fresh:
+        _LOGGER.debug("[GBFS] FRESH - Feed: %s", feed.url)
+        return FeedResult.FRESH
+
+    headers = {}
+    if feed.data is not None:
+        if feed.etag:
+            headers["If-None-Match"] = feed.etag
+        if feed.last_modified:
+            headers["If-Modified-Since"] = feed.last_modified
+
+    try:
+        async with session.get(
+            feed.url, headers=headers, timeout=REQUEST_TIMEOUT
+        ) as response:
+            if response.status == 304 and feed.data is not None:
+                _LOGGER.debug("[GBFS] NOT MODIFIED - Feed: %s", feed.url)
+                feed.update_expiry(None)
+                return FeedResult.NOT_MODIFIED
+            if response.status != 200:
+                _LOGGER.error(
+                    "Failed to fetch GBFS feed %s: %s", feed.url, response.status
+                )
+                return FeedResult.FAILED
+            body = await response.read()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+        if executor is not None and len(body) >= OFFLOAD_MIN_BYTES:
+            payload = await executor(json_loads, body)
+        else:
+            payload = json_loads(body)
+    except Exception as e:
+        _LOGGER.error("Error during GBFS request: %s", str(e))
+        return FeedResult.FAILED
+
+    feed.etag = etag
+    feed.last_modified = last_modified
+    feed.response_bytes = len(body)
+    feed.data = payload.get("data", {})
+    feed.ttl = payload.get("ttl", 0)
+    feed.update_expiry(payload.get("last_updated"))
+    _LOGGER.debug(
+        "[GBFS] UPDATE - Feed: %s - Bytes: %d - TTL: %ds",
+        feed.url,
+        len(body),
+        feed.ttl,
+    )
+    return FeedResult.UPDATED
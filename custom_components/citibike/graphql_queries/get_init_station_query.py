@@ -5,6 +5,7 @@ GET_INIT_STATION_QUERY = """
         supply(input: $input) {
             stations {
                 stationName
+                siteId
                 location {
                     lat
                     lng
@@ -1,22 +1,23 @@
 """GraphQL query for fetching Citibike supply data."""
 
-GET_SUPPLY_QUERY = """
-    query GetSupply($input: SupplyInput) {
-        supply(input: $input) {
-            stations {
+# Station fields requested for each attribute group
+SUPPLY_FIELD_GROUPS = {
+    "counts": """
                 stationName
-                location {
-                    lat
-                    lng
-                }
                 siteId
-                totalBikesAvailable
-                bikeDocksAvailable
                 lastUpdatedMs
                 bikesAvailable
                 ebikesAvailable
                 isOffline
-                totalRideablesAvailable
+                totalRideablesAvailable""",
+    "docks": """
+                location {
+                    lat
+                    lng
+                }
+                totalBikesAvailable
+                bikeDocksAvailable""",
+    "ebike_battery": """
                 ebikes {
                     rideableName
                     batteryStatus {
@@ -26,8 +27,25 @@ GET_SUPPLY_QUERY = """
                             unit
                         }
                     }
-                }
-            }
-        }
-    }
+                }""",
+}
+
+
+def build_supply_query(groups: set[str]) -> str:
+    """Build the smallest supply query covering the given attribute groups."""
+    fields = "".join(
+        fields
+        for group, fields in SUPPLY_FIELD_GROUPS.items()
+        if group == "counts" or group in groups
+    )
+    return f"""
+    query GetSupply($input: SupplyInput) {{
+        supply(input: $input) {{
+            stations {{{fields}
+            }}
+        }}
+    }}
 """
+
+
+GET_SUPPLY_QUERY = build_supply_query(set(SUPPLY_FIELD_GROUPS))
@@ -1,63 +1,278 @@
+from collections.abc import Awaitable, Callable
+import codecs
 import json
 import logging
+import re
+import time
 from typing import Any
 
 import aiohttp
 
+from homeassistant.util.json import json_loads
+
+from .areas import Area
 from .const import NetworkGraphQLEndpoints
+from .metrics import FetchMetrics
+from .spatial import haversine_km
 
 _LOGGER = logging.getLogger(__name__)
 
 # Default headers
 DEFAULT_HEADERS = {"Content-Type": "application/json"}
 
+# Per-request timeout, the connection pool is owned by the caller's session
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10)
+
+# Size of the body chunks read by the streaming supply parser
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Smaller bodies are decoded on the event loop, an executor hop costs more than
+# decoding them. Streamed reads are batched up to this size for each hop.
+OFFLOAD_MIN_BYTES = 16 * 1024
+
+# Runs a blocking function off the event loop, e.g. hass.async_add_executor_job
+Executor = Callable[..., Awaitable[Any]]
+
+
+def _decode_body(body: bytes) -> dict[str, Any]:
+    """Decode a GraphQL response body and clean its rideable names."""
+    data = json_loads(body)
+    clean_data(data)
+    return data
+
+
+def _timed_feed(
+    parser: "SupplyStreamParser", chunk: bytes
+) -> tuple[list[dict[str, Any]], float]:
+    """Feed a chunk to the parser, returning its stations and the time taken."""
+    start = time.perf_counter()
+    stations = parser.feed(chunk)
+    return stations, time.perf_counter() - start
+
 
 async def fetch_graphql_data(
+    session: aiohttp.ClientSession,
     endpoint: NetworkGraphQLEndpoints,
     query: dict[str, Any],
     headers: dict[str, str] | None = None,
+    executor: Executor | None = None,
 ) -> dict[str, Any]:
-    """Fetch data from the GraphQL API and clean it."""
+    """Fetch data from the GraphQL API and clean it, off the loop if possible."""
     # Use default headers if no headers are passed
     if headers is None:
         headers = DEFAULT_HEADERS
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                endpoint.value, json=query, headers=headers
-            ) as response:
-                if response.status != 200:
-                    _LOGGER.error(
-                        "Failed to connect: %s, %s",
-                        response.status,
-                        await response.text(),
-                    )
-                    return {"base": "cannot_connect"}
-                _LOGGER.debug("Successfully fetched data from GraphQL API")
-                data = await response.json()
-
-                # Clean the data here
-                clean_data(data)
-
-                return data
+        async with session.post(
+            endpoint.value, json=query, headers=headers, timeout=REQUEST_TIMEOUT
+        ) as response:
+            if response.status != 200:
+                _LOGGER.error(
+                    "Failed to connect: %s, %s",
+                    response.status,
+                    await response.text(),
+                )
+                return {"base": "cannot_connect"}
+            _LOGGER.debug("Successfully fetched data from GraphQL API")
+            body = await response.read()
+
+            # Decode and clean the data, large bodies in the executor
+            if executor is not None and len(body) >= OFFLOAD_MIN_BYTES:
+                return await executor(_decode_body, body)
+            return _decode_body(body)
+    except Exception as e:
+        _LOGGER.error("Error during GraphQL request: %s", str(e))
+        return {"base": "cannot_connect"}
+
+
+async def fetch_supply_data(
+    session: aiohttp.ClientSession,
+    endpoint: NetworkGraphQLEndpoints,
+    query: dict[str, Any],
+    tracked: set[str] | None = None,
+    headers: dict[str, str] | None = None,
+    metrics: FetchMetrics | None = None,
+    areas: list[Area] | None = None,
+    executor: Executor | None = None,
+    on_stations: Callable[[list[dict[str, Any]]], None] | None = None,
+) -> dict[str, Any]:
+    """Stream a supply query, keeping stations that are tracked or inside an area.
+
+    If on_stations is given it receives each batch of kept stations as soon as
+    it is parsed.
+    """
+    if headers is None:
+        headers = DEFAULT_HEADERS
+
+    parser = SupplyStreamParser(tracked, areas)
+    stations = []
+    response_bytes = 0
+    decode_time = 0.0
+    blocking_time = 0.0
+    start = time.perf_counter()
+
+    async def feed(data: bytes) -> None:
+        """Feed data to the parser, off the loop if possible."""
+        nonlocal decode_time, blocking_time
+        if executor is not None:
+            found, elapsed = await executor(_timed_feed, parser, data)
+        else:
+            found, elapsed = _timed_feed(parser, data)
+            blocking_time += elapsed
+        stations.extend(found)
+        decode_time += elapsed
+        if found and on_stations is not None:
+            on_stations(found)
+
+    try:
+        async with session.post(
+            endpoint.value, json=query, headers=headers, timeout=REQUEST_TIMEOUT
+        ) as response:
+            if response.status != 200:
+                _LOGGER.error(
+                    "Failed to connect: %s, %s",
+                    response.status,
+                    await response.text(),
+                )
+                return {"base": "cannot_connect"}
+            pending = b""
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                response_bytes += len(chunk)
+                if executor is None:
+                    await feed(chunk)
+                    continue
+                # Reads over TCP are mostly a few KiB, so they are batched for
+                # every executor hop to decode enough to pay for itself
+                pending += chunk
+                if len(pending) >= OFFLOAD_MIN_BYTES:
+                    await feed(pending)
+                    pending = b""
+            if pending:
+                await feed(pending)
     except Exception as e:
         _LOGGER.error("Error during GraphQL request: %s", str(e))
         return {"base": "cannot_connect"}
 
+    if metrics is not None:
+        metrics.request_ms = round((time.perf_counter() - start) * 1000, 1)
+        metrics.response_bytes = response_bytes
+        metrics.decode_ms = round(decode_time * 1000, 1)
+        metrics.decode_blocking_ms = round(blocking_time * 1000, 1)
+        metrics.stations_seen = parser.seen
+
+    if not parser.done:
+        _LOGGER.error("GraphQL response did not contain a station list")
+        return {"base": "cannot_connect"}
+
+    _LOGGER.debug(
+        "Successfully streamed %d of %d stations from GraphQL API",
+        len(stations),
+        parser.seen,
+    )
+    return {"data": {"supply": {"stations": stations}}}
+
+
+class SupplyStreamParser:
+    """Incrementally extract station objects from a GetSupply response body."""
+
+    _STATIONS = re.compile(r'"stations"\s*:\s*\[')
+    _BETWEEN = re.compile(r"[\s,]*")
+    # The C scanner decodes a whole station and reports where it ends
+    _DECODER = json.JSONDecoder()
+
+    def __init__(
+        self, tracked: set[str] | None = None, areas: list[Area] | None = None
+    ) -> None:
+        """Initialize the parser, keeping every station if tracked is None."""
+        self._tracked = tracked
+        self._areas = areas or []
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._in_array = False
+        self.done = False
+        self.seen = 0
+
+    def feed(self, chunk: bytes) -> list[dict[str, Any]]:
+        """Consume a body chunk and return the tracked stations it completed."""
+        if self.done:
+            return []
+        self._buffer += self._decoder.decode(chunk)
+
+        if not self._in_array:
+            match = self._STATIONS.search(self._buffer)
+            if match is None:
+                # Keep only enough of the prefix to match the marker later
+                self._buffer = self._buffer[-64:]
+                return []
+            self._in_array = True
+            self._buffer = self._buffer[match.end() :]
+
+        return self._scan()
+
+    def _scan(self) -> list[dict[str, Any]]:
+        """Decode the complete station objects at the start of the buffer."""
+        buf = self._buffer
+        pos = 0
+        stations = []
+
+        while True:
+            pos = self._BETWEEN.match(buf, pos).end()
+            if pos >= len(buf):
+                break
+            if buf[pos] == "]":
+                self.done = True
+                break
+            if buf[pos] != "{":
+                raise ValueError(f"Unexpected {buf[pos]!r} in station list")
+            try:
+                station, end = self._DECODER.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # The station is completed by a later chunk
+                break
+            pos = end
+            self.seen += 1
+            # Rideable names are cleaned when the station is normalised
+            if self._is_tracked(station):
+                stations.append(station)
+
+        # Drop everything before the station currently being read
+        self._buffer = buf[pos:]
+        return stations
+
+    def _is_tracked(self, station: dict[str, Any]) -> bool:
+        """Check the station's siteId, name and position."""
+        if self._tracked is None:
+            return True
+        if (
+            station.get("siteId") in self._tracked
+            or station.get("stationName") in self._tracked
+        ):
+            return True
+        location = station.get("location") or {}
+        lat, lng = location.get("lat"), location.get("lng")
+        if lat is None or lng is None:
+            return False
+        return any(
+            haversine_km(area.latitude, area.longitude, lat, lng) <= area.radius_km
+            for area in self._areas
+        )
+
 
 def clean_data(data: dict[str, Any]) -> None:
     """Clean the rideable names by replacing Unicode characters."""
     if "data" in data and "supply" in data["data"]:
         for station in data["data"]["supply"].get("stations", []):
-            for ebike in station.get("ebikes", []):
-                if "rideableName" in ebike:
-                    ebike["rideableName"] = ebike["rideableName"].replace("\u00b7", ".")
-
-            for scooter in station.get("scooters", []):
-                if "rideableName" in scooter:
-                    scooter["rideableName"] = scooter["rideableName"].replace(
-                        "\u00b7", "."
-                    )
+            clean_station(station)
     else:
         _LOGGER.warning("Data format is unexpected, cannot clean the rideable names")
+
+
+def clean_station(station: dict[str, Any]) -> None:
+    """Clean the rideable names of one station."""
+    for ebike in station.get("ebikes", []):
+        if "rideableName" in ebike:
+            ebike["rideableName"] = ebike["rideableName"].replace("\u00b7", ".")
+
+    for scooter in station.get("scooters", []):
+        if "rideableName" in scooter:
+            scooter["rideableName"] = scooter["rideableName"].replace("\u00b7", ".")
@@ -0,0 +1,289 @@
+"""Per-station availability history and forecasts for Citibike integration."""
+
+from array import array
+import base64
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import timedelta
+import logging
+import sys
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, HISTORY_STORAGE_KEY, STORAGE_VERSION
+from .models import StationRecord
+
+_LOGGER = logging.getLogger(__name__)
+
+# Samples kept per station, a week at the default five minute poll
+HISTORY_SAMPLES = 2016
+
+# Histories not appended to for this long are dropped when saving
+HISTORY_MAX_AGE = timedelta(days=7)
+
+# Seconds to batch history writes before saving them to storage, pending writes
+# are flushed when Home Assistant stops
+HISTORY_SAVE_DELAY = 900
+
+FORECAST_HORIZON = timedelta(minutes=15)
+
+# Samples fitted for the short-term trend, which must span at least the horizon
+TREND_WINDOW = timedelta(hours=1)
+TREND_MIN_SAMPLES = 3
+
+# Past days compared at the same time of day, within this tolerance
+PROFILE_TOLERANCE = timedelta(minutes=15)
+PROFILE_MIN_SAMPLES = 3
+
+# Docks are unknown when the dock info group is not selected
+_NO_DOCKS = -1
+
+_DAY_MS = 86_400_000
+
+
+@dataclass(slots=True, frozen=True)
+class Forecast:
+    """Expected counts at a station after the forecast horizon."""
+
+    bikes: float
+    ebikes: float
+    docks: float | None
+    trend_per_hour: float | None
+    profile_samples: int
+
+
+class StationHistory:
+    """Fixed-size ring buffer of a station's counts, one array per column."""
+
+    __slots__ = ("_count", "_docks", "_ebikes", "_head", "_bikes", "_updated_ms")
+
+    def __init__(self) -> None:
+        """Allocate the empty buffer."""
+        self._updated_ms = array("q", bytes(8 * HISTORY_SAMPLES))
+        self._bikes = array("h", bytes(2 * HISTORY_SAMPLES))
+        self._ebikes = array("h", bytes(2 * HISTORY_SAMPLES))
+        self._docks = array("h", bytes(2 * HISTORY_SAMPLES))
+        self._head = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of samples held."""
+        return self._count
+
+    @property
+    def last_updated_ms(self) -> int | None:
+        """Return the lastUpdatedMs of the newest sample."""
+        if not self._count:
+            return None
+        return self._updated_ms[(self._head - 1) % HISTORY_SAMPLES]
+
+    def append(self, station: StationRecord) -> bool:
+        """Add a sample unless the station has not reported since the last one."""
+        last = self.last_updated_ms
+        if last is not None and station.last_updated_ms <= last:
+            return False
+        head = self._head
+        self._updated_ms[head] = station.last_updated_ms
+        self._bikes[head] = station.bikes_available
+        self._ebikes[head] = station.ebikes_available
+        self._docks[head] = (
+            _NO_DOCKS if station.docks_available is None else station.docks_available
+        )
+        self._head = (head + 1) % HISTORY_SAMPLES
+        self._count = min(self._count + 1, HISTORY_SAMPLES)
+        return True
+
+    def _ordered(self, column: array) -> array:
+        """Return a column oldest sample first."""
+        if self._count < HISTORY_SAMPLES:
+            return column[: self._count]
+        return column[self._head :] + column[: self._head]
+
+    def forecast(self, now_ms: int | None = None) -> Forecast | None:
+        """Forecast the counts one horizon after now from trend and daily profile."""
+        if self._count < 2:
+            return None
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        times = self._ordered(self._updated_ms)
+        horizon_ms = FORECAST_HORIZON // timedelta(milliseconds=1)
+
+        # Start of the trend window and past samples at this time of day
+        window = bisect_left(times, now_ms - TREND_WINDOW // timedelta(milliseconds=1))
+        if (
+            len(times) - window < TREND_MIN_SAMPLES
+            or times[-1] - times[window] < horizon_ms
+        ):
+            window = len(times)
+        tolerance_ms = PROFILE_TOLERANCE // timedelta(milliseconds=1)
+        profile = []
+        day = 1
+        while (target := now_ms - day * _DAY_MS) >= times[0]:
+            start = bisect_left(times, target - tolerance_ms)
+            end = bisect_left(times, target + tolerance_ms)
+            later = bisect_left(times, target + horizon_ms)
+            if start < end and later < len(times):
+                profile.append((end - 1, later))
+            day += 1
+
+        columns = []
+        trend_per_hour = None
+        for column in (self._bikes, self._ebikes):
+            values = self._ordered(column)
+            slope = _slope(times[window:], values[window:])
+            delta = 0.0 if slope is None else slope * horizon_ms
+            if len(profile) >= PROFILE_MIN_SAMPLES:
+                profile_delta = sum(
+                    values[later] - values[index] for index, later in profile
+                ) / len(profile)
+                delta = (delta + profile_delta) / 2
+            if trend_per_hour is None and slope is not None:
+                trend_per_hour = round(slope * 3_600_000, 2)
+            columns.append(max(values[-1] + delta, 0))
+
+        # A station holds no more bikes than it has docks, free ones included
+        bikes, ebikes = columns
+        newest = (self._head - 1) % HISTORY_SAMPLES
+        docks = None
+        if self._docks[newest] != _NO_DOCKS:
+            capacity = (
+                self._bikes[newest] + self._ebikes[newest] + self._docks[newest]
+            )
+            bikes = min(bikes, capacity)
+            ebikes = min(ebikes, capacity - bikes)
+            docks = round(capacity - bikes - ebikes, 1)
+        bikes = round(bikes, 1)
+        ebikes = round(ebikes, 1)
+        return Forecast(
+            bikes=bikes,
+            ebikes=ebikes,
+            docks=docks,
+            trend_per_hour=trend_per_hour,
+            profile_samples=len(profile),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the samples oldest first as base64 encoded little-endian arrays."""
+        return {
+            name: _encode(self._ordered(column))
+            for name, column in (
+                ("updated_ms", self._updated_ms),
+                ("bikes", self._bikes),
+                ("ebikes", self._ebikes),
+                ("docks", self._docks),
+            )
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "StationHistory":
+        """Restore a history saved by to_dict."""
+        history = cls()
+        columns = (
+            (history._updated_ms, _decode("q", data["updated_ms"])),
+            (history._bikes, _decode("h", data["bikes"])),
+            (history._ebikes, _decode("h", data["ebikes"])),
+            (history._docks, _decode("h", data["docks"])),
+        )
+        count = min(len(columns[0][1]), HISTORY_SAMPLES)
+        for column, values in columns:
+            column[:count] = values[-count:] if count else array(column.typecode)
+        history._count = count
+        history._head = count % HISTORY_SAMPLES
+        return history
+
+
+def _slope(times: array, values: array) -> float | None:
+    """Return the least squares slope of values over times, per millisecond."""
+    count = len(times)
+    if count < 2:
+        return None
+    mean_t = sum(times) / count
+    mean_v = sum(values) / count
+    variance = sum((t - mean_t) ** 2 for t in times)
+    if not variance:
+        return None
+    covariance = sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values))
+    return covariance / variance
+
+
+def _encode(column: array) -> str:
+    """Encode a column as little-endian base64."""
+    if sys.byteorder != "little":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return base64.b64encode(column.tobytes()).decode()
+
+
+def _decode(typecode: str, encoded: str) -> array:
+    """Decode a column encoded by _encode."""
+    column = array(typecode, base64.b64decode(encoded))
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column
+
+
+class HistoryStore:
+    """Keep station histories and persist them through Home Assistant storage."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the history store."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, HISTORY_STORAGE_KEY
+        )
+        self._histories: dict[str, StationHistory] = {}
+
+    async def async_load(self) -> None:
+        """Restore the histories from storage."""
+        if not (stored := await self._store.async_load()):
+            return
+        for site_id, data in stored.get("stations", {}).items():
+            self._histories[site_id] = StationHistory.from_dict(data)
+        _LOGGER.debug("[History] LOAD - Stations: %d", len(self._histories))
+
+    def get(self, site_id: str | None) -> StationHistory | None:
+        """Return a station's history."""
+        return self._histories.get(site_id)
+
+    @callback
+    def async_record(self, stations: list[StationRecord]) -> None:
+        """Append the stations that reported since their last sample."""
+        appended = 0
+        for station in stations:
+            if (history := self._histories.get(station.site_id)) is None:
+                history = self._histories[station.site_id] = StationHistory()
+            appended += history.append(station)
+        if appended:
+            self._store.async_delay_save(self._data_to_save, HISTORY_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the recent histories in a JSON serialisable form."""
+        cutoff_ms = (time.time() - HISTORY_MAX_AGE.total_seconds()) * 1000
+        for site_id in [
+            site_id
+            for site_id, history in self._histories.items()
+            if (history.last_updated_ms or 0) < cutoff_ms
+        ]:
+            del self._histories[site_id]
+        return {
+            "stations": {
+                site_id: history.to_dict()
+                for site_id, history in self._histories.items()
+            }
+        }
+
+
+async def async_get_history_store(hass: HomeAssistant) -> HistoryStore:
+    """Return the history store, loading persisted histories on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "history_store" not in domain_data:
+        store = HistoryStore(hass)
+        domain_data["history_store"] = store
+        domain_data["history_store_loaded"] = hass.async_create_task(
+            store.async_load()
+        )
+    await domain_data["history_store_loaded"]
+    return domain_data["history_store"]
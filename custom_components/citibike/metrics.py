@@ -0,0 +1,41 @@
+"""Fetch pipeline metrics for Citibike integration."""
+
+from dataclasses import asdict, dataclass
+from typing import Any
+
+
+@dataclass
+class FetchMetrics:
+    """Timings and counters of one network's fetch pipeline."""
+
+    queue_ms: float | None = None
+    request_ms: float | None = None
+    response_bytes: int | None = None
+    decode_ms: float | None = None
+    decode_blocking_ms: float | None = None
+    normalise_ms: float | None = None
+    loop_blocking_ms: float | None = None
+    stations_seen: int | None = None
+    station_count: int | None = None
+    records_reused: int | None = None
+    detail_queue_ms: float | None = None
+    detail_ms: float | None = None
+    detail_stations: int | None = None
+    ebikes_truncated: int | None = None
+    fetches: int = 0
+    failures: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    not_modified: int = 0
+
+    @property
+    def cache_hit_ratio(self) -> float | None:
+        """Return the share of updates served from the sensor cache, in percent."""
+        lookups = self.cache_hits + self.cache_misses
+        if not lookups:
+            return None
+        return round(100 * self.cache_hits / lookups, 1)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics for diagnostics."""
+        return {**asdict(self), "cache_hit_ratio": self.cache_hit_ratio}
@@ -0,0 +1,171 @@
+"""Compact station records for Citibike integration."""
+
+from dataclasses import dataclass
+import sys
+from typing import Any
+
+from homeassistant.const import UnitOfLength
+from homeassistant.util.unit_conversion import DistanceConverter
+
+# Units of distanceRemaining in the supply data
+API_DISTANCE_UNITS = {
+    "MILES": UnitOfLength.MILES,
+    "KILOMETERS": UnitOfLength.KILOMETERS,
+}
+
+
+def range_miles(distance: float | None, unit: str | None) -> float | None:
+    """Return an e-bike range in miles, the fixed unit of the range sensors."""
+    if distance is None:
+        return None
+    return round(
+        DistanceConverter.convert(
+            distance,
+            API_DISTANCE_UNITS.get(unit, UnitOfLength.MILES),
+            UnitOfLength.MILES,
+        ),
+        2,
+    )
+
+
+@dataclass(slots=True, frozen=True)
+class RideableRecord:
+    """Battery state of one e-bike docked at a station."""
+
+    name: str
+    battery_percent: int
+    distance_remaining: float
+    distance_unit: str
+
+    @classmethod
+    def from_dict(cls, ebike: dict[str, Any]) -> "RideableRecord":
+        """Build a record from a GraphQL e-bike object."""
+        battery = ebike["batteryStatus"]
+        distance = battery["distanceRemaining"]
+        return cls(
+            # Names arrive with middle dots, e.g. "···1234"
+            name=ebike["rideableName"].replace("\u00b7", "."),
+            battery_percent=battery["percent"],
+            distance_remaining=distance["value"],
+            distance_unit=sys.intern(distance["unit"]),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the record as a GraphQL e-bike object."""
+        return {
+            "rideableName": self.name,
+            "batteryStatus": {
+                "percent": self.battery_percent,
+                "distanceRemaining": {
+                    "value": self.distance_remaining,
+                    "unit": self.distance_unit,
+                },
+            },
+        }
+
+
+@dataclass(slots=True, frozen=True)
+class StationRecord:
+    """Supply state of one station."""
+
+    site_id: str
+    name: str
+    last_updated_ms: int
+    bikes_available: int
+    ebikes_available: int
+    is_offline: bool
+    total_rideables_available: int
+    latitude: float | None = None
+    longitude: float | None = None
+    total_bikes_available: int | None = None
+    docks_available: int | None = None
+    ebikes: tuple[RideableRecord, ...] = ()
+
+    @classmethod
+    def from_dict(cls, station: dict[str, Any]) -> "StationRecord":
+        """Build a record from a GraphQL station object."""
+        location = station.get("location") or {}
+        return cls(
+            site_id=station["siteId"],
+            name=station["stationName"],
+            last_updated_ms=station["lastUpdatedMs"],
+            bikes_available=station["bikesAvailable"],
+            ebikes_available=station["ebikesAvailable"],
+            is_offline=station["isOffline"],
+            total_rideables_available=station["totalRideablesAvailable"],
+            latitude=location.get("lat"),
+            longitude=location.get("lng"),
+            total_bikes_available=station.get("totalBikesAvailable"),
+            docks_available=station.get("bikeDocksAvailable"),
+            ebikes=tuple(
+                RideableRecord.from_dict(ebike) for ebike in station.get("ebikes", [])
+            ),
+        )
+
+    @property
+    def fingerprint(self) -> tuple:
+        """Return the values whose change should produce a state write."""
+        return (
+            self.last_updated_ms,
+            self.total_rideables_available,
+            self.bikes_available,
+            self.ebikes_available,
+            self.docks_available,
+            self.is_offline,
+            self.ebikes,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the record as a GraphQL station object."""
+        station = {
+            "siteId": self.site_id,
+            "stationName": self.name,
+            "lastUpdatedMs": self.last_updated_ms,
+            "bikesAvailable": self.bikes_available,
+            "ebikesAvailable": self.ebikes_available,
+            "isOffline": self.is_offline,
+            "totalRideablesAvailable": self.total_rideables_available,
+            "ebikes": [ebike.to_dict() for ebike in self.ebikes],
+        }
+        if self.docks_available is not None:
+            station["location"] = {"lat": self.latitude, "lng": self.longitude}
+            station["totalBikesAvailable"] = self.total_bikes_available
+            station["bikeDocksAvailable"] = self.docks_available
+        return station
+
+
+@dataclass(slots=True, frozen=True)
+class StationView:
+    """Values derived from a station record, shared by the station's sensors."""
+
+    record: StationRecord
+    ebike_status: list[dict[str, Any]]
+    max_ebike_distance: float
+    mean_ebike_battery: float | None
+    distance_unit: str | None
+
+    @classmethod
+    def from_record(cls, record: StationRecord) -> "StationView":
+        """Derive the view of a station record."""
+        ebikes = record.ebikes
+        return cls(
+            record=record,
+            ebike_status=[
+                {
+                    "bike_id": ebike.name,
+                    "battery_percent": ebike.battery_percent,
+                    "distance_remaining": ebike.distance_remaining,
+                    "distance_remaining_units": ebike.distance_unit,
+                }
+                for ebike in ebikes
+            ],
+            max_ebike_distance=max(
+                (ebike.distance_remaining for ebike in ebikes), default=0
+            ),
+            mean_ebike_battery=(
+                round(sum(ebike.battery_percent for ebike in ebikes) / len(ebikes), 1)
+                if ebikes
+                else None
+            ),
+            distance_unit=ebikes[0].distance_unit if ebikes else None,
+        )
@@ -0,0 +1,73 @@
+"""Retry and circuit breaker helpers for Citibike integration."""
+
+from datetime import datetime, timedelta
+import logging
+import random
+from typing import ClassVar
+
+_LOGGER = logging.getLogger(__name__)
+
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 20.0
+
+
+def backoff_delay(attempt: int) -> float:
+    """Return a full-jitter exponential delay in seconds for a retry attempt."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempt))
+
+
+class CircuitBreaker:
+    """Stop calling an endpoint after repeated failures, then probe it again."""
+
+    _breakers: ClassVar[dict[str, "CircuitBreaker"]] = {}
+    FAILURE_THRESHOLD: ClassVar[int] = 5
+    COOLDOWN: ClassVar[timedelta] = timedelta(minutes=5)
+
+    def __init__(self, endpoint: str) -> None:
+        """Initialize a closed breaker."""
+        self._endpoint = endpoint
+        self._failures = 0
+        self._opened_at: datetime | None = None
+
+    @classmethod
+    def for_endpoint(cls, endpoint: str) -> "CircuitBreaker":
+        """Return the shared breaker for an endpoint."""
+        if (breaker := cls._breakers.get(endpoint)) is None:
+            breaker = cls._breakers[endpoint] = cls(endpoint)
+        return breaker
+
+    @property
+    def is_open(self) -> bool:
+        """Return True while requests to the endpoint are being skipped."""
+        return (
+            self._opened_at is not None
+            and datetime.now() - self._opened_at < self.COOLDOWN
+        )
+
+    @property
+    def retry_after(self) -> timedelta | None:
+        """Return the time left until the breaker lets a probe through."""
+        if not self.is_open:
+            return None
+        return self.COOLDOWN - (datetime.now() - self._opened_at)
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful request."""
+        if self._opened_at is not None:
+            _LOGGER.info("[Breaker] CLOSE - Endpoint: %s", self._endpoint)
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        """Count a failed request, opening the breaker at the threshold."""
+        self._failures += 1
+        if self._failures >= self.FAILURE_THRESHOLD:
+            # A failed probe after the cooldown reopens the breaker
+            self._opened_at = datetime.now()
+            _LOGGER.warning(
+                "[Breaker] OPEN - Endpoint: %s - Failures: %d - Cooldown: %s",
+                self._endpoint,
+                self._failures,
+                self.COOLDOWN,
+            )
@@ -0,0 +1,131 @@
+"""Rideable change feed for Citibike integration."""
+
+from dataclasses import dataclass
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from .const import EVENT_RIDEABLE_CHANGED, SIGNAL_RIDEABLES_CHANGED
+from .models import RideableRecord, StationRecord, range_miles
+
+_LOGGER = logging.getLogger(__name__)
+
+ARRIVED = "arrived"
+DEPARTED = "departed"
+BATTERY_CHANGED = "battery_changed"
+
+
+@dataclass(slots=True, frozen=True)
+class RideableChange:
+    """One e-bike that arrived at, left or changed charge at a station."""
+
+    change: str
+    rideable: RideableRecord
+    # Last known state of a rideable whose battery changed
+    previous: RideableRecord | None = None
+
+    def passes(self, min_battery: float, min_range: float) -> bool:
+        """Return True if the rideable meets the battery and range thresholds.
+
+        The range threshold is in miles, like the range sensors.
+        """
+        return self.rideable.battery_percent >= min_battery and (
+            range_miles(self.rideable.distance_remaining, self.rideable.distance_unit)
+            >= min_range
+        )
+
+    def as_event_data(self, station: StationRecord) -> dict[str, Any]:
+        """Return the bus event data, keyed like the ebike_status attribute."""
+        data = {
+            "station_id": station.name,
+            "site_id": station.site_id,
+            "change": self.change,
+            "bike_id": self.rideable.name,
+            "battery_percent": self.rideable.battery_percent,
+            "distance_remaining": self.rideable.distance_remaining,
+            "distance_remaining_units": self.rideable.distance_unit,
+        }
+        if self.previous is not None:
+            data["previous_battery_percent"] = self.previous.battery_percent
+        return data
+
+
+def diff_rideables(
+    previous: tuple[RideableRecord, ...], current: tuple[RideableRecord, ...]
+) -> list[RideableChange]:
+    """Return the changes between two rideable lists of a station."""
+    if previous == current:
+        return []
+    before = {rideable.name: rideable for rideable in previous}
+    changes = []
+    for rideable in current:
+        if (old := before.pop(rideable.name, None)) is None:
+            changes.append(RideableChange(ARRIVED, rideable))
+        elif old.battery_percent != rideable.battery_percent:
+            changes.append(RideableChange(BATTERY_CHANGED, rideable, old))
+    changes.extend(RideableChange(DEPARTED, rideable) for rideable in before.values())
+    return changes
+
+
+class RideableFeed:
+    """Diff a network's e-bikes between snapshots and publish the changes."""
+
+    def __init__(self, hass: HomeAssistant, network: str) -> None:
+        """Initialize the feed."""
+        self._hass = hass
+        self._network = network
+        self._rideables: dict[str, tuple[RideableRecord, ...]] = {}
+
+    @callback
+    def async_reset(self) -> None:
+        """Forget the last e-bikes, the next snapshot becomes the baseline."""
+        self._rideables = {}
+
+    @callback
+    def async_discard(self, site_ids: set[str]) -> None:
+        """Forget the e-bikes of stations that left the snapshot."""
+        for site_id in site_ids:
+            self._rideables.pop(site_id, None)
+
+    @callback
+    def async_publish(
+        self,
+        changed: list[StationRecord],
+        thresholds: dict[str, tuple[float, float]],
+    ) -> None:
+        """Diff the changed stations and signal and fire their changes.
+
+        Bus events are fired for the stations in thresholds, keyed by siteId or
+        name, whose rideables meet the (minimum battery, minimum range) pair.
+        """
+        for station in changed:
+            previous = self._rideables.get(station.site_id)
+            self._rideables[station.site_id] = station.ebikes
+            if previous is None or not (
+                changes := diff_rideables(previous, station.ebikes)
+            ):
+                continue
+            _LOGGER.debug(
+                "[Rideables] Network: %s - Station: %s - Changes: %d",
+                self._network,
+                station.name,
+                len(changes),
+            )
+            # Dispatcher listeners get every change, the bus only what passes
+            async_dispatcher_send(
+                self._hass,
+                SIGNAL_RIDEABLES_CHANGED.format(station.site_id),
+                station,
+                changes,
+            )
+            limits = thresholds.get(station.site_id) or thresholds.get(station.name)
+            if limits is None:
+                continue
+            for change in changes:
+                if change.passes(*limits):
+                    self._hass.bus.async_fire(
+                        EVENT_RIDEABLE_CHANGED,
+                        {"network": self._network, **change.as_event_data(station)},
+                    )
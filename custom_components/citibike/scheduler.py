@@ -0,0 +1,207 @@
+"""Adaptive poll scheduling for Citibike integration."""
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime, time, timedelta
+import heapq
+import itertools
+import logging
+import math
+import random
+import time as monotonic_time
+import zlib
+
+_LOGGER = logging.getLogger(__name__)
+
+MIN_SCAN_INTERVAL = timedelta(minutes=1)
+MAX_SCAN_INTERVAL = timedelta(minutes=15)
+QUIET_SCAN_INTERVAL = timedelta(minutes=30)
+
+# Number of observed polls used to estimate the cadence
+CADENCE_SAMPLES = 12
+
+# Random spread applied to every interval, as a fraction of it
+JITTER = 0.1
+
+# Fraction of the poll interval a snapshot stays valid in the sensor cache
+CACHE_TTL_FACTOR = 0.9
+
+# Supply requests in flight, and started per minute, across every network
+MAX_CONCURRENT_REQUESTS = 3
+MAX_REQUESTS_PER_MINUTE = 20
+
+
+def in_quiet_hours(now: time, start: time | None, end: time | None) -> bool:
+    """Return True if now falls in a quiet window, which may span midnight."""
+    if start is None or end is None or start == end:
+        return False
+    if start < end:
+        return start <= now < end
+    return now >= start or now < end
+
+
+class AdaptivePollScheduler:
+    """Derive a network's poll interval from its observed update cadence."""
+
+    def __init__(self, network_name: str, default_interval: timedelta) -> None:
+        """Initialize the scheduler."""
+        self._network_name = network_name
+        self._default_interval = default_interval
+        # (seconds since the previous poll, stations compared, stations changed)
+        self._polls: deque[tuple[float, int, int]] = deque(maxlen=CADENCE_SAMPLES)
+        self._last_poll: datetime | None = None
+        self._last_updated: dict[str, int] = {}
+        # Stable per-network phase so networks do not poll in lockstep
+        self._phase = (zlib.crc32(network_name.encode()) % 1000) / 1000
+
+    def initial_interval(self) -> timedelta:
+        """Return the first interval, offset by the network's phase."""
+        return self._default_interval * (1 + JITTER * self._phase)
+
+    def observe(self, fetched: datetime, last_updated: dict[str, int]) -> None:
+        """Record how many stations reported since the previous fetch."""
+        # Cached snapshots carry the timestamp of the fetch already seen
+        if self._last_poll is not None and fetched > self._last_poll:
+            compared = last_updated.keys() & self._last_updated.keys()
+            if compared:
+                changed = sum(
+                    last_updated[site_id] != self._last_updated[site_id]
+                    for site_id in compared
+                )
+                elapsed = (fetched - self._last_poll).total_seconds()
+                self._polls.append((elapsed, len(compared), changed))
+        if self._last_poll is None or fetched > self._last_poll:
+            self._last_poll = fetched
+            self._last_updated = last_updated
+
+    @property
+    def cadence(self) -> timedelta | None:
+        """Return the mean time between reports of a station.
+
+        A station that reports at random every c seconds on average has
+        changed by the next poll t seconds later with probability
+        1 - exp(-t / c), so c follows from the share of stations that changed.
+        Unlike the gap between polls, this can show reports faster than them.
+        """
+        if not self._polls:
+            return None
+        compared = sum(count for _, count, _ in self._polls)
+        changed = sum(count for _, _, count in self._polls)
+        elapsed = sum(seconds * count for seconds, count, _ in self._polls) / compared
+        # Keep the share off 0 and 1, where the estimate is unbounded
+        share = min(max(changed, 0.5), compared - 0.5) / compared
+        return timedelta(seconds=-elapsed / math.log(1 - share))
+
+    @staticmethod
+    def jittered(interval: timedelta) -> timedelta:
+        """Return the interval spread by the jitter fraction."""
+        return interval * (1 + random.uniform(-JITTER, JITTER))
+
+    def next_interval(self, quiet: bool) -> timedelta:
+        """Return the jittered interval until the next poll."""
+        if quiet:
+            interval = QUIET_SCAN_INTERVAL
+        elif (cadence := self.cadence) is None:
+            interval = self._default_interval
+        else:
+            # Halfway back to the default, so a noisy estimate cannot drag the
+            # interval far from it
+            cadence = min(max(cadence, MIN_SCAN_INTERVAL), MAX_SCAN_INTERVAL)
+            interval = (cadence + self._default_interval) / 2
+
+        interval = self.jittered(interval)
+        _LOGGER.debug(
+            "[Scheduler] Network: %s - Cadence: %s - Quiet: %s - Next poll in %s",
+            self._network_name,
+            self.cadence,
+            quiet,
+            interval,
+        )
+        return interval
+
+
+class RequestBudget:
+    """Shared concurrency and rate limit handing request slots out by priority."""
+
+    def __init__(
+        self,
+        concurrency: int = MAX_CONCURRENT_REQUESTS,
+        per_minute: int = MAX_REQUESTS_PER_MINUTE,
+    ) -> None:
+        """Initialize the budget."""
+        self._concurrency = concurrency
+        self._per_minute = per_minute
+        self._active = 0
+        self._starts: deque[float] = deque()
+        # Waiters as [-priority, arrival, wakeup future], highest priority first
+        self._queue: list[list] = []
+        self._arrivals = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        """Return the number of requests waiting for a slot."""
+        return len(self._queue)
+
+    @asynccontextmanager
+    async def slot(self, name: str, priority: float) -> AsyncIterator[float]:
+        """Hold a request slot, yielding the seconds spent waiting for it."""
+        queued = await self._acquire(priority)
+        if queued >= 0.001:
+            _LOGGER.debug(
+                "[Scheduler] Network: %s - Priority: %.1f - Queued for %.3fs",
+                name,
+                priority,
+                queued,
+            )
+        try:
+            yield queued
+        finally:
+            self._active -= 1
+            self._wake()
+
+    async def _acquire(self, priority: float) -> float:
+        """Wait until the request is first in line and the budget allows it."""
+        loop = asyncio.get_running_loop()
+        start = monotonic_time.monotonic()
+        waiter = [-priority, next(self._arrivals), loop.create_future()]
+        heapq.heappush(self._queue, waiter)
+        try:
+            while True:
+                if self._queue[0] is waiter and self._active < self._concurrency:
+                    if (delay := self._rate_delay()) <= 0:
+                        break
+                    await asyncio.sleep(delay)
+                    continue
+                # Woken when a slot frees up or the waiter ahead leaves
+                await waiter[2]
+                waiter[2] = loop.create_future()
+        except BaseException:
+            self._queue.remove(waiter)
+            heapq.heapify(self._queue)
+            self._wake()
+            raise
+
+        heapq.heappop(self._queue)
+        self._active += 1
+        self._starts.append(monotonic_time.monotonic())
+        self._wake()
+        return monotonic_time.monotonic() - start
+
+    def _rate_delay(self) -> float:
+        """Return the seconds until another request fits in the rate limit."""
+        now = monotonic_time.monotonic()
+        while self._starts and now - self._starts[0] >= 60:
+            self._starts.popleft()
+        if len(self._starts) < self._per_minute:
+            return 0.0
+        return self._starts[0] + 60 - now
+
+    def _wake(self) -> None:
+        """Let the first waiter check the budget again."""
+        if self._queue and not (future := self._queue[0][2]).done():
+            future.set_result(None)
+
+
+request_budget = RequestBudget()
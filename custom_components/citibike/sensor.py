@@ -1,225 +1,766 @@
-"""Integration for Citibike sensors."""
-
-from datetime import datetime, timedelta
-import logging
-
-import voluptuous as vol
-
-from homeassistant import config_entries, core
-from homeassistant.components.sensor import PLATFORM_SCHEMA as SENSOR_PLATFORM_SCHEMA
-import homeassistant.helpers.config_validation as cv
-from homeassistant.helpers.entity import Entity
-
-from .cache import SensorDataCache
-from .const import CONF_STATIONID, NetworkGraphQLEndpoints, NetworkNames, NetworkRegion
-from .graphql_queries.get_supply_query import GET_SUPPLY_QUERY
-from .graphql_requests import fetch_graphql_data
-
-_LOGGER = logging.getLogger(__name__)
-SCAN_INTERVAL = timedelta(minutes=5)
-
-SENSOR_PLATFORM_SCHEMA = SENSOR_PLATFORM_SCHEMA.extend(
-    {
-        vol.Required(CONF_STATIONID): cv.string,
-    }
-)
-
-
-async def async_setup_entry(
-    hass: core.HomeAssistant, entry: config_entries.ConfigEntry, async_add_entities
-) -> None:
-    """Set up the Citibike sensors from a config entry."""
-    _LOGGER.debug("Setting up Citibike sensor entry")
-    data = GQLServiceData(entry.data)
-    await data.update()
-    sensor = CitibikeSensor(entry.data, data)
-    async_add_entities([sensor], True)
-
-
-def setup_platform(
-    hass: core.HomeAssistant,
-    config: config_entries.ConfigEntry,
-    add_devices,
-    discovery_info=None,
-) -> None:
-    """Set up the Citibike sensors."""
-    _LOGGER.debug("Setting up Citibike sensor platform")
-    data = GQLServiceData(config)
-    data.update()
-    sensor = CitibikeSensor(config, data)
-    add_devices([sensor], True)
-
-
-class CitibikeSensor(Entity):
-    """Sensor that reads the status for a Citibike station."""
-
-    def __init__(self, config: dict, data: "GQLServiceData") -> None:
-        """Initialize the sensor."""
-        self._id = config[CONF_STATIONID]
-        self._data = data
-        self._state = 0
-
-        network = NetworkNames(config["network"]).value
-        station_name = f"{network}_{self._id}"
-        self._name = station_name
-        self._network = network
-        self._site_id = None
-
-        self._latitude = None
-        self._longitude = None
-        self._capacity = 0
-        self._region = None
-
-        self._last_reported = None
-        self._docks_available = 0
-        self._num_bikes_available = 0
-        self._num_ebikes_available = 0
-        self._is_offline = False
-        self._total_rideables_available = 0
-        self._ebike_status = []
-        self._max_ebike_distance = 0
-
-    @property
-    def name(self) -> str:
-        """Return the name of the sensor."""
-        return self._name
-
-    @property
-    def state(self) -> int:
-        """Return the state of the sensor."""
-        return self._total_rideables_available
-
-    @property
-    def unique_id(self) -> str:
-        """Return the unique ID of the sensor."""
-        return self._id
-
-    @property
-    def device_class(self) -> str:
-        """Return the device class of the sensor."""
-        return None
-
-    @property
-    def unit_of_measurement(self) -> str:
-        """Return the unit of measurement of the sensor."""
-        return "rideables"
-
-    @property
-    def icon(self) -> str:
-        """Return the icon used for the frontend."""
-        return "mdi:bicycle"
-
-    @property
-    def extra_state_attributes(self) -> dict:
-        """Return the attributes of the sensor."""
-        return {
-            "station_id": self._site_id,
-            "station_name": self._id,
-            "network": self._network,
-            "latitude": self._latitude,
-            "longitude": self._longitude,
-            "total_rideables_available": self._total_rideables_available,
-            "station_capacity": self._capacity,
-            "docks_available": self._docks_available,
-            "available_bike_types": {
-                "Human Powered": self._num_bikes_available,
-                "Electric Powered": self._num_ebikes_available,
-            },
-            "max_ebike_distance": self._max_ebike_distance,
-            "ebike_status": self._ebike_status,
-            "last_reported": self._last_reported,
-            "is_offline": self._is_offline,
-        }
-
-    async def async_update(self) -> None:
-        """Update the sensor."""
-        _LOGGER.debug("Updating Citibike sensor %s", self._id)
-        await self._data.update()
-        station = self._data.station_data
-        self._site_id = station["siteId"]
-        self._latitude = station["location"]["lat"]
-        self._longitude = station["location"]["lng"]
-        self._capacity = station["totalBikesAvailable"] + station["bikeDocksAvailable"]
-        self._last_reported = datetime.fromtimestamp(station["lastUpdatedMs"] / 1000)
-        self._docks_available = station["bikeDocksAvailable"]
-        self._num_bikes_available = station["bikesAvailable"]
-        self._num_ebikes_available = station["ebikesAvailable"]
-        self._is_offline = station["isOffline"]
-        self._total_rideables_available = station["totalRideablesAvailable"]
-
-        self._ebike_status = [
-            {
-                "bike_id": ebike["rideableName"],
-                "battery_percent": ebike["batteryStatus"]["percent"],
-                "distance_remaining": ebike["batteryStatus"]["distanceRemaining"][
-                    "value"
-                ],
-                "distance_remaining_units": ebike["batteryStatus"]["distanceRemaining"][
-                    "unit"
-                ],
-            }
-            for ebike in station["ebikes"]
-        ]
-        self._max_ebike_distance = max(
-            (
-                ebike["batteryStatus"]["distanceRemaining"]["value"]
-                for ebike in station["ebikes"]
-            ),
-            default=0,
-        )
-
-        self._state = station["totalRideablesAvailable"]
-
-
-class GQLServiceData:
-    """Query GQL API for Citibike data."""
-
-    def __init__(self, config: dict) -> None:
-        """Initialize the GQL Service Data."""
-        self._config = config
-        self.station_data = None
-        self._network = NetworkNames(self._config.get("network"))
-
-    async def update(self) -> None:
-        """Update data based on SCAN_INTERVAL."""
-        network_name = self._network.name
-
-        # Check sensor data cache
-        if cached_data := SensorDataCache.get_cached_data(network_name):
-            self._update_station_data(cached_data)
-            return
-
-        _LOGGER.debug("[API] Fetching data for network %s", network_name)
-        region_code = NetworkRegion[network_name].value
-
-        query = {
-            "query": GET_SUPPLY_QUERY,
-            "variables": {
-                "input": {"regionCode": region_code, "rideablePageLimit": 1000}
-            },
-        }
-
-        data = await fetch_graphql_data(NetworkGraphQLEndpoints[network_name], query)
-
-        if data.get("base") == "cannot_connect":
-            _LOGGER.warning("[API] Connection failed for network %s", network_name)
-            return
-
-        stations = data["data"]["supply"]["stations"]
-        SensorDataCache.update_cache(network_name, stations)
-        self._update_station_data(stations)
-
-    def _update_station_data(self, stations: list[dict[str, any]]) -> None:
-        """Update station data from stations list."""
-        station_name = self._config[CONF_STATIONID]
-        if station := next(
-            (s for s in stations if s["stationName"] == station_name),
-            None,
-        ):
-            self.station_data = station
-            _LOGGER.debug(
-                "[Station] Updated %s - Bikes: %d, E-bikes: %d",
-                station_name,
-                station["bikesAvailable"],
-                station["ebikesAvailable"],
-            )
+"""Integration for Citibike sensors."""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import logging
+
+import voluptuous as vol
+
+from homeassistant import config_entries, core
+from homeassistant.core import Event, EventStateChangedData, callback
+from homeassistant.components.sensor import (
+    PLATFORM_SCHEMA as SENSOR_PLATFORM_SCHEMA,
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfInformation,
+    UnitOfLength,
+    UnitOfTime,
+)
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.event import async_track_state_change_event
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.restore_state import RestoreEntity
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .areas import Area, AreaAggregate, zone_area
+from .const import (
+    CONF_AREA_RADIUS,
+    CONF_ATTRIBUTE_GROUPS,
+    CONF_DATA_SOURCE,
+    CONF_SITEID,
+    CONF_STATIONID,
+    CONF_ZONES,
+    DEFAULT_ATTRIBUTE_GROUPS,
+    DOMAIN,
+    NetworkNames,
+)
+from .coordinator import (
+    CitibikeCoordinator,
+    async_get_coordinator,
+    entry_stations,
+)
+from .entity import CitibikeStationEntity
+from .history import FORECAST_HORIZON, HistoryStore, async_get_history_store
+from .metrics import FetchMetrics
+from .models import StationView, range_miles
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class CitibikeDetailSensorEntityDescription(SensorEntityDescription):
+    """Describe a numeric station detail sensor."""
+
+    value_fn: Callable[[StationView], float | int | None]
+    group: str | None = None
+
+
+@dataclass(frozen=True, kw_only=True)
+class CitibikeAreaSensorEntityDescription(SensorEntityDescription):
+    """Describe an availability sensor for the stations inside a zone."""
+
+    value_fn: Callable[[AreaAggregate], float | int | None]
+
+
+@dataclass(frozen=True, kw_only=True)
+class CitibikeDiagnosticSensorEntityDescription(SensorEntityDescription):
+    """Describe a fetch pipeline diagnostic sensor."""
+
+    value_fn: Callable[[FetchMetrics], float | int | None]
+
+
+DETAIL_SENSORS: tuple[CitibikeDetailSensorEntityDescription, ...] = (
+    CitibikeDetailSensorEntityDescription(
+        key="ebikes",
+        name="E-bikes",
+        icon="mdi:bicycle-electric",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda view: view.record.ebikes_available,
+    ),
+    CitibikeDetailSensorEntityDescription(
+        key="classic_bikes",
+        name="Classic bikes",
+        icon="mdi:bicycle",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda view: view.record.bikes_available,
+    ),
+    CitibikeDetailSensorEntityDescription(
+        key="docks",
+        name="Docks",
+        icon="mdi:parking",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda view: view.record.docks_available,
+        group="docks",
+    ),
+    CitibikeDetailSensorEntityDescription(
+        key="max_ebike_range",
+        name="Max e-bike range",
+        icon="mdi:map-marker-distance",
+        device_class=SensorDeviceClass.DISTANCE,
+        native_unit_of_measurement=UnitOfLength.MILES,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda view: (
+            range_miles(view.max_ebike_distance, view.distance_unit)
+            if view.record.ebikes
+            else None
+        ),
+        group="ebike_battery",
+    ),
+    CitibikeDetailSensorEntityDescription(
+        key="mean_ebike_battery",
+        name="Mean e-bike battery",
+        device_class=SensorDeviceClass.BATTERY,
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda view: view.mean_ebike_battery,
+        group="ebike_battery",
+    ),
+)
+
+AREA_SENSORS: tuple[CitibikeAreaSensorEntityDescription, ...] = (
+    CitibikeAreaSensorEntityDescription(
+        key="ebikes",
+        name="E-bikes",
+        icon="mdi:bicycle-electric",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda aggregate: aggregate.ebikes,
+    ),
+    CitibikeAreaSensorEntityDescription(
+        key="classic_bikes",
+        name="Classic bikes",
+        icon="mdi:bicycle",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda aggregate: aggregate.bikes,
+    ),
+    CitibikeAreaSensorEntityDescription(
+        key="docks",
+        name="Docks",
+        icon="mdi:parking",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda aggregate: aggregate.docks,
+    ),
+    CitibikeAreaSensorEntityDescription(
+        key="max_ebike_range",
+        name="Max e-bike range",
+        icon="mdi:map-marker-distance",
+        device_class=SensorDeviceClass.DISTANCE,
+        native_unit_of_measurement=UnitOfLength.MILES,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda aggregate: range_miles(
+            aggregate.max_ebike_range, aggregate.distance_unit
+        ),
+    ),
+)
+
+DIAGNOSTIC_SENSORS: tuple[CitibikeDiagnosticSensorEntityDescription, ...] = (
+    CitibikeDiagnosticSensorEntityDescription(
+        key="queue_time",
+        name="Queue time",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.queue_ms,
+    ),
+    CitibikeDiagnosticSensorEntityDescription(
+        key="request_latency",
+        name="Request latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.request_ms,
+    ),
+    CitibikeDiagnosticSensorEntityDescription(
+        key="response_size",
+        name="Response size",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.response_bytes,
+    ),
+    CitibikeDiagnosticSensorEntityDescription(
+        key="decode_time",
+        name="Decode time",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.decode_ms,
+    ),
+    CitibikeDiagnosticSensorEntityDescription(
+        key="normalise_time",
+        name="Normalise time",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.normalise_ms,
+    ),
+    CitibikeDiagnosticSensorEntityDescription(
+        key="loop_blocking_time",
+        name="Loop blocking time",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.loop_blocking_ms,
+    ),
+    CitibikeDiagnosticSensorEntityDescription(
+        key="station_count",
+        name="Station count",
+        icon="mdi:map-marker-multiple",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.station_count,
+    ),
+    CitibikeDiagnosticSensorEntityDescription(
+        key="cache_hit_ratio",
+        name="Cache hit ratio",
+        icon="mdi:cached",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.cache_hit_ratio,
+    ),
+)
+
+SENSOR_PLATFORM_SCHEMA = SENSOR_PLATFORM_SCHEMA.extend(
+    {
+        vol.Required(CONF_STATIONID): cv.string,
+    }
+)
+
+
+def _entry_entities(
+    entry: config_entries.ConfigEntry, coordinator: CitibikeCoordinator
+) -> dict[tuple[str, str], SensorEntity]:
+    """Return the entities an entry should have, keyed by station or zone and key."""
+    groups = set(entry.options.get(CONF_ATTRIBUTE_GROUPS, DEFAULT_ATTRIBUTE_GROUPS))
+    # GBFS has no per e-bike detail, its sensors would never get a value
+    if entry.options.get(CONF_DATA_SOURCE) == "gbfs":
+        groups.discard("ebike_battery")
+    entities = {}
+    for station in entry_stations(entry):
+        config = {
+            "network": entry.data["network"],
+            CONF_STATIONID: station[CONF_STATIONID],
+            CONF_SITEID: station.get(CONF_SITEID),
+        }
+        entities[(station[CONF_STATIONID], "")] = CitibikeSensor(config, coordinator)
+        for description in DETAIL_SENSORS:
+            if description.group is None or description.group in groups:
+                entities[(station[CONF_STATIONID], description.key)] = (
+                    CitibikeDetailSensor(config, coordinator, description)
+                )
+        entities[(station[CONF_STATIONID], "forecast")] = CitibikeForecastSensor(
+            config, coordinator
+        )
+    for zone in entry.options.get(CONF_ZONES, []):
+        for description in AREA_SENSORS:
+            entities[(zone, description.key)] = CitibikeAreaSensor(
+                coordinator, entry, zone, description
+            )
+    return entities
+
+
+async def async_setup_entry(
+    hass: core.HomeAssistant, entry: config_entries.ConfigEntry, async_add_entities
+) -> None:
+    """Set up the Citibike sensors from a config entry."""
+    _LOGGER.debug("Setting up Citibike sensor entry")
+    coordinator = async_get_coordinator(hass, NetworkNames(entry.data["network"]))
+
+    # Add the sensors right away and fetch in the background, once per network.
+    # Snapshots only hold tracked stations, so a newly added one forces a refetch.
+    missing = [
+        station
+        for station in entry_stations(entry)
+        if coordinator.get_station(station.get(CONF_SITEID), station[CONF_STATIONID])
+        is None
+    ]
+    if missing or not coordinator.has_live_data:
+        coordinator.async_schedule_refresh(force=bool(missing))
+
+    # Entries created before stations were keyed by siteId only know the name
+    if CONF_STATIONID in entry.data and entry.data.get(CONF_SITEID) is None:
+        station = coordinator.get_station(None, entry.data[CONF_STATIONID])
+        if station is not None:
+            hass.config_entries.async_update_entry(
+                entry, data={**entry.data, CONF_SITEID: station.site_id}
+            )
+
+    entities = _entry_entities(entry, coordinator)
+    platforms = hass.data[DOMAIN].setdefault("platforms", {})
+    platforms[entry.entry_id] = (async_add_entities, entities)
+    entry.async_on_unload(lambda: platforms.pop(entry.entry_id, None))
+    entry.async_on_unload(entry.add_update_listener(_async_sync_entities))
+
+    added: list[SensorEntity] = list(entities.values())
+
+    # Network diagnostics belong to one loaded entry of the network at a time
+    owners = hass.data[DOMAIN].setdefault("diagnostics_owners", {})
+    if coordinator.network.name not in owners:
+        owners[coordinator.network.name] = entry.entry_id
+        added.extend(_diagnostic_sensors(coordinator))
+    entry.async_on_unload(lambda: _async_hand_over_diagnostics(hass, entry))
+
+    # One batch for every station of the entry
+    async_add_entities(added)
+
+
+def _diagnostic_sensors(coordinator: CitibikeCoordinator) -> list[SensorEntity]:
+    """Return the diagnostic sensors of a network."""
+    return [
+        CitibikeNetworkDiagnosticSensor(coordinator, description)
+        for description in DIAGNOSTIC_SENSORS
+    ]
+
+
+@core.callback
+def _async_hand_over_diagnostics(
+    hass: core.HomeAssistant, entry: config_entries.ConfigEntry
+) -> None:
+    """Give the diagnostics of an unloaded entry to another entry of the network."""
+    network = NetworkNames(entry.data["network"])
+    owners = hass.data[DOMAIN].get("diagnostics_owners", {})
+    if owners.get(network.name) != entry.entry_id:
+        return
+    del owners[network.name]
+
+    # The entry's own sensors are removed by now, so the unique IDs are free
+    for entry_id, (async_add_entities, _) in hass.data[DOMAIN]["platforms"].items():
+        other = hass.config_entries.async_get_entry(entry_id)
+        if (
+            entry_id == entry.entry_id
+            or other is None
+            or other.data["network"] != network.value
+        ):
+            continue
+        _LOGGER.debug("Moving %s diagnostics to entry %s", network.value, other.title)
+        owners[network.name] = entry_id
+        async_add_entities(_diagnostic_sensors(async_get_coordinator(hass, network)))
+        return
+
+
+async def _async_sync_entities(
+    hass: core.HomeAssistant, entry: config_entries.ConfigEntry
+) -> None:
+    """Add and remove station entities to match the options, without a reload."""
+    if (platform := hass.data[DOMAIN].get("platforms", {}).get(entry.entry_id)) is None:
+        return
+    async_add_entities, entities = platform
+    coordinator = async_get_coordinator(hass, NetworkNames(entry.data["network"]))
+    wanted = _entry_entities(entry, coordinator)
+    registry = er.async_get(hass)
+
+    for key in entities.keys() - wanted.keys():
+        entity = entities.pop(key)
+        _LOGGER.debug("Removing Citibike entity %s", entity.name)
+        if entity.registry_entry is not None:
+            registry.async_remove(entity.entity_id)
+        else:
+            await entity.async_remove()
+
+    # Area sensors stay and follow the new radius
+    for entity in entities.values():
+        if isinstance(entity, CitibikeAreaSensor):
+            entity.async_set_radius(entry.options.get(CONF_AREA_RADIUS))
+
+    if new := {key: wanted[key] for key in wanted.keys() - entities.keys()}:
+        _LOGGER.debug("Adding %d Citibike entities", len(new))
+        entities.update(new)
+        async_add_entities(list(new.values()))
+
+
+async def async_setup_platform(
+    hass: core.HomeAssistant,
+    config: config_entries.ConfigEntry,
+    async_add_entities,
+    discovery_info=None,
+) -> None:
+    """Set up the Citibike sensors."""
+    _LOGGER.debug("Setting up Citibike sensor platform")
+    coordinator = async_get_coordinator(hass, NetworkNames(config["network"]))
+    if not coordinator.has_live_data:
+        coordinator.async_schedule_refresh()
+    async_add_entities([CitibikeSensor(config, coordinator)])
+
+
+class CitibikeSensor(CitibikeStationEntity, RestoreEntity):
+    """Sensor that reads the status for a Citibike station."""
+
+    # The per e-bike list is exposed for display only, history uses the
+    # numeric detail sensors instead
+    _unrecorded_attributes = frozenset({"ebike_status"})
+
+    def __init__(self, config: dict, coordinator: CitibikeCoordinator) -> None:
+        """Initialize the sensor."""
+        super().__init__(config, coordinator)
+        self._state = 0
+        self._name = f"{self._network}_{self._id}"
+
+        self._latitude = None
+        self._longitude = None
+        self._capacity = 0
+        self._region = None
+
+        self._last_reported = None
+        self._docks_available = 0
+        self._num_bikes_available = 0
+        self._num_ebikes_available = 0
+        self._is_offline = False
+        self._total_rideables_available = 0
+        self._ebike_status = []
+        self._max_ebike_distance = 0
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        return self._name
+
+    @property
+    def state(self) -> int:
+        """Return the state of the sensor."""
+        return self._total_rideables_available
+
+    @property
+    def unique_id(self) -> str:
+        """Return the unique ID of the sensor."""
+        return self._id
+
+    @property
+    def device_class(self) -> str:
+        """Return the device class of the sensor."""
+        return None
+
+    @property
+    def unit_of_measurement(self) -> str:
+        """Return the unit of measurement of the sensor."""
+        return "rideables"
+
+    @property
+    def icon(self) -> str:
+        """Return the icon used for the frontend."""
+        return "mdi:bicycle"
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return the attributes of the sensor."""
+        return {
+            "station_id": self._site_id,
+            "station_name": self._id,
+            "network": self._network,
+            "latitude": self._latitude,
+            "longitude": self._longitude,
+            "total_rideables_available": self._total_rideables_available,
+            "station_capacity": self._capacity,
+            "docks_available": self._docks_available,
+            "available_bike_types": {
+                "Human Powered": self._num_bikes_available,
+                "Electric Powered": self._num_ebikes_available,
+            },
+            "max_ebike_distance": self._max_ebike_distance,
+            "ebike_status": self._ebike_status,
+            "last_reported": self._last_reported,
+            "is_offline": self._is_offline,
+            "is_stale": self._is_stale,
+        }
+
+    async def async_added_to_hass(self) -> None:
+        """Populate the sensor from the shared snapshot or its last state."""
+        await super().async_added_to_hass()
+        if self._update_from_station():
+            return
+        if (last_state := await self.async_get_last_state()) is not None:
+            self._restore_from_state(last_state)
+
+    def _restore_from_state(self, last_state: core.State) -> None:
+        """Restore the sensor from its state before the restart."""
+        _LOGGER.debug("Restoring Citibike sensor %s", self._id)
+        attributes = last_state.attributes
+        bike_types = attributes.get("available_bike_types") or {}
+        if last_state.state.isdigit():
+            self._total_rideables_available = int(last_state.state)
+        self._site_id = self._site_id or attributes.get("station_id")
+        self._latitude = attributes.get("latitude")
+        self._longitude = attributes.get("longitude")
+        self._capacity = attributes.get("station_capacity", 0)
+        self._docks_available = attributes.get("docks_available", 0)
+        self._num_bikes_available = bike_types.get("Human Powered", 0)
+        self._num_ebikes_available = bike_types.get("Electric Powered", 0)
+        self._max_ebike_distance = attributes.get("max_ebike_distance", 0)
+        self._ebike_status = attributes.get("ebike_status", [])
+        self._last_reported = attributes.get("last_reported")
+        self._is_offline = attributes.get("is_offline", False)
+
+    def _apply_station(self, view: StationView) -> None:
+        """Update the sensor from the station view."""
+        station = view.record
+        self._last_reported = datetime.fromtimestamp(station.last_updated_ms / 1000)
+        self._num_bikes_available = station.bikes_available
+        self._num_ebikes_available = station.ebikes_available
+        self._is_offline = station.is_offline
+        self._total_rideables_available = station.total_rideables_available
+
+        # Dock info and e-bike detail are only present when selected in options
+        if station.docks_available is not None:
+            self._latitude = station.latitude
+            self._longitude = station.longitude
+            self._capacity = station.total_bikes_available + station.docks_available
+            self._docks_available = station.docks_available
+
+        # Derived once per station update and shared with the detail sensors
+        self._ebike_status = view.ebike_status
+        self._max_ebike_distance = view.max_ebike_distance
+
+        self._state = station.total_rideables_available
+
+
+class CitibikeDetailSensor(CitibikeStationEntity, SensorEntity):
+    """Numeric sensor for one detail of a Citibike station."""
+
+    entity_description: CitibikeDetailSensorEntityDescription
+
+    def __init__(
+        self,
+        config: dict,
+        coordinator: CitibikeCoordinator,
+        description: CitibikeDetailSensorEntityDescription,
+    ) -> None:
+        """Initialize the detail sensor."""
+        super().__init__(config, coordinator)
+        self.entity_description = description
+        self._name = f"{self._network}_{self._id}_{description.key}"
+        self._value = None
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        return self._name
+
+    @property
+    def unique_id(self) -> str:
+        """Return the unique ID of the sensor."""
+        return f"{self._id}_{self.entity_description.key}"
+
+    @property
+    def native_value(self) -> float | int | None:
+        """Return the value of the sensor."""
+        return self._value
+
+    async def async_added_to_hass(self) -> None:
+        """Populate the sensor from the shared snapshot when added."""
+        await super().async_added_to_hass()
+        self._update_from_station()
+
+    def _apply_station(self, view: StationView) -> None:
+        """Update the sensor from the station view."""
+        self._value = self.entity_description.value_fn(view)
+
+
+class CitibikeForecastSensor(CitibikeStationEntity, SensorEntity):
+    """Sensor forecasting the bikes at a station from its availability history."""
+
+    _attr_icon = "mdi:bicycle-basket"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, config: dict, coordinator: CitibikeCoordinator) -> None:
+        """Initialize the forecast sensor."""
+        super().__init__(config, coordinator)
+        self._history_store: HistoryStore | None = None
+        self._value = None
+        self._attributes = {}
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        return f"{self._network}_{self._id}_forecast"
+
+    @property
+    def unique_id(self) -> str:
+        """Return the unique ID of the sensor."""
+        return f"{self._id}_forecast"
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the bikes expected after the forecast horizon."""
+        return self._value
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return the forecast breakdown."""
+        return self._attributes
+
+    async def async_added_to_hass(self) -> None:
+        """Populate the sensor from the persisted history when added."""
+        await super().async_added_to_hass()
+        self._history_store = await async_get_history_store(self.hass)
+        self._update_from_station()
+
+    def _apply_station(self, view: StationView) -> None:
+        """Recompute the forecast once the station reports again."""
+        if self._history_store is None:
+            return
+        history = self._history_store.get(view.record.site_id)
+        if history is None or (forecast := history.forecast()) is None:
+            self._value = None
+            self._attributes = {}
+            return
+        self._value = round(forecast.bikes + forecast.ebikes, 1)
+        self._attributes = {
+            "classic_bikes": forecast.bikes,
+            "ebikes": forecast.ebikes,
+            "docks": forecast.docks,
+            "horizon_minutes": FORECAST_HORIZON // timedelta(minutes=1),
+            "trend_per_hour": forecast.trend_per_hour,
+            "profile_samples": forecast.profile_samples,
+            "history_samples": len(history),
+        }
+
+
+class CitibikeAreaSensor(CoordinatorEntity[CitibikeCoordinator], SensorEntity):
+    """Availability sensor summing the stations inside a zone."""
+
+    entity_description: CitibikeAreaSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: CitibikeCoordinator,
+        entry: config_entries.ConfigEntry,
+        zone_entity_id: str,
+        description: CitibikeAreaSensorEntityDescription,
+    ) -> None:
+        """Initialize the area sensor."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._entry_id = entry.entry_id
+        self._zone = zone_entity_id
+        self._radius_m = entry.options.get(CONF_AREA_RADIUS)
+        self._network = coordinator.network
+        self._area: Area | None = None
+        self._aggregate: AreaAggregate | None = None
+        self._written_version = None
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        zone = self._zone.split(".", 1)[-1]
+        return f"{self._network.value}_{zone}_{self.entity_description.key}"
+
+    @property
+    def unique_id(self) -> str:
+        """Return the unique ID of the sensor."""
+        return f"{self._entry_id}_{self._zone}_{self.entity_description.key}"
+
+    @property
+    def available(self) -> bool:
+        """Return True if the zone exists and the network has data."""
+        return super().available and self._aggregate is not None
+
+    @property
+    def native_value(self) -> float | int | None:
+        """Return the value of the sensor."""
+        if self._aggregate is None:
+            return None
+        return self.entity_description.value_fn(self._aggregate)
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return the attributes of the sensor."""
+        return {
+            "zone": self._zone,
+            "radius_km": None if self._area is None else self._area.radius_km,
+            "stations": None if self._aggregate is None else self._aggregate.stations,
+        }
+
+    async def async_added_to_hass(self) -> None:
+        """Start following the zone's aggregate and the zone itself."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_track_state_change_event(
+                self.hass, [self._zone], self._handle_zone_change
+            )
+        )
+        if not self._async_update_area():
+            _LOGGER.warning("Zone %s not found for %s", self._zone, self.name)
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop following the zone's aggregate."""
+        if self._area is not None:
+            self.coordinator.async_untrack_area(self._area)
+        await super().async_will_remove_from_hass()
+
+    @callback
+    def async_set_radius(self, radius_m: float | None) -> None:
+        """Follow a new zone radius option."""
+        if radius_m != self._radius_m:
+            self._radius_m = radius_m
+            self._async_update_area()
+
+    @callback
+    def _handle_zone_change(self, event: Event[EventStateChangedData]) -> None:
+        """Follow the zone when it is moved, resized, added or removed."""
+        if self._async_update_area():
+            # Stations outside the old area are not in the snapshot yet
+            self.coordinator.async_schedule_refresh(force=True)
+
+    @callback
+    def _async_update_area(self) -> bool:
+        """Switch to the aggregate of the current area, returning True on a change."""
+        area = zone_area(self.hass, self._zone, self._radius_m)
+        if area == self._area:
+            return False
+        if self._area is not None:
+            self.coordinator.async_untrack_area(self._area)
+        self._area = area
+        self._aggregate = (
+            None if area is None else self.coordinator.async_track_area(area)
+        )
+        self._written_version = None
+        if self.hass is not None and self.entity_id is not None:
+            self.async_write_ha_state()
+        return True
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when the aggregate or availability changed."""
+        version = None if self._aggregate is None else self._aggregate.version
+        if (version, self.available) == self._written_version:
+            return
+        self._written_version = (version, self.available)
+        super()._handle_coordinator_update()
+
+
+class CitibikeNetworkDiagnosticSensor(
+    CoordinatorEntity[CitibikeCoordinator], SensorEntity
+):
+    """Diagnostic sensor for the fetch pipeline of a network."""
+
+    entity_description: CitibikeDiagnosticSensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(
+        self,
+        coordinator: CitibikeCoordinator,
+        description: CitibikeDiagnosticSensorEntityDescription,
+    ) -> None:
+        """Initialize the diagnostic sensor."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._network = coordinator.network
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        return f"{self._network.value}_{self.entity_description.key}"
+
+    @property
+    def unique_id(self) -> str:
+        """Return the unique ID of the sensor."""
+        return f"{self._network.name.lower()}_{self.entity_description.key}"
+
+    @property
+    def native_value(self) -> float | int | None:
+        """Return the value of the sensor."""
+        return self.entity_description.value_fn(self.coordinator.metrics)
@@ -0,0 +1,87 @@
+"""Services for Citibike integration."""
+
+from datetime import datetime
+import logging
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+
+from .cache import (
+    CacheData,
+    SensorDataCache,
+    StationCache,
+    async_get_cache_store,
+    network_refs,
+)
+from .const import (
+    ATTR_NETWORK,
+    DOMAIN,
+    SERVICE_FLUSH_CACHE,
+    SERVICE_INSPECT_CACHE,
+    NetworkNames,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+FLUSH_CACHE_SCHEMA = vol.Schema(
+    {vol.Optional(ATTR_NETWORK): vol.In([network.value for network in NetworkNames])}
+)
+
+
+def _summarise(entries: dict[str, CacheData]) -> dict[str, Any]:
+    """Return the age and size of each cached network."""
+    now = datetime.now()
+    return {
+        network_name: {
+            "timestamp": cached.timestamp.isoformat(),
+            "age_seconds": round((now - cached.timestamp).total_seconds()),
+            "stations": len(cached.data),
+            "entries": network_refs(network_name),
+        }
+        for network_name, cached in entries.items()
+    }
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the cache inspection and flush services."""
+
+    async def async_inspect_cache(call: ServiceCall) -> ServiceResponse:
+        """Return a summary of the station and sensor caches."""
+        return {
+            "station_cache": _summarise(StationCache.get_all()),
+            "sensor_cache": _summarise(SensorDataCache.get_all()),
+        }
+
+    async def async_flush_cache(call: ServiceCall) -> None:
+        """Drop the cached data of one network, or of every network."""
+        if (network := call.data.get(ATTR_NETWORK)) is None:
+            _LOGGER.info("[Service] FLUSH - All networks")
+            StationCache.flush()
+            SensorDataCache.flush()
+        else:
+            network_name = NetworkNames(network).name
+            _LOGGER.info("[Service] FLUSH - Network: %s", network_name)
+            StationCache.evict(network_name)
+            SensorDataCache.evict(network_name)
+        store = await async_get_cache_store(hass)
+        store.async_schedule_station_save()
+        store.async_schedule_save()
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_INSPECT_CACHE,
+        async_inspect_cache,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_FLUSH_CACHE, async_flush_cache, schema=FLUSH_CACHE_SCHEMA
+    )
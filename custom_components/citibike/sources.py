@@ -0,0 +1,266 @@
+"""Supply data sources for Citibike integration."""
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+import logging
+import time
+from typing import Any, ClassVar
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .areas import Area
+from .const import (
+    DEFAULT_ATTRIBUTE_GROUPS,
+    NetworkGBFSFeeds,
+    NetworkGraphQLEndpoints,
+    NetworkNames,
+    NetworkRegion,
+)
+from .gbfs_requests import FeedResult, GBFSFeed, fetch_gbfs_feed
+from .graphql_queries.get_supply_query import GET_SUPPLY_QUERY, build_supply_query
+from .graphql_requests import fetch_supply_data
+from .metrics import FetchMetrics
+from .resilience import CircuitBreaker
+from .spatial import haversine_km
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SupplySource(ABC):
+    """Backend returning a network's stations as GraphQL station objects."""
+
+    name: ClassVar[str]
+    # Whether per e-bike detail can be fetched separately from the counts
+    supports_detail: ClassVar[bool] = False
+
+    def __init__(
+        self, hass: HomeAssistant, network: NetworkNames, metrics: FetchMetrics
+    ) -> None:
+        """Initialize the source."""
+        self._hass = hass
+        self._network = network
+        self._metrics = metrics
+        self.breaker = CircuitBreaker.for_endpoint(self.endpoint)
+
+    @property
+    @abstractmethod
+    def endpoint(self) -> str:
+        """Return the URL the source's circuit breaker guards."""
+
+    @abstractmethod
+    async def async_fetch(
+        self,
+        groups: set[str],
+        tracked: set[str] | None,
+        areas: list[Area],
+        page_limit: int,
+    ) -> dict[str, Any]:
+        """Fetch the tracked stations with the fields of the attribute groups."""
+
+    @abstractmethod
+    async def async_fetch_detail(
+        self,
+        site_ids: set[str],
+        groups: set[str],
+        page_limit: int,
+        on_stations: Callable[[list[dict[str, Any]]], None],
+    ) -> dict[str, Any]:
+        """Fetch the per e-bike detail of some stations, passing batches on."""
+
+
+class GraphQLSupplySource(SupplySource):
+    """Stream the GetSupply query of the network's GraphQL API."""
+
+    name: ClassVar[str] = "graphql"
+    supports_detail: ClassVar[bool] = True
+
+    @property
+    def endpoint(self) -> str:
+        """Return the GraphQL endpoint of the network."""
+        return NetworkGraphQLEndpoints[self._network.name].value
+
+    async def async_fetch(
+        self,
+        groups: set[str],
+        tracked: set[str] | None,
+        areas: list[Area],
+        page_limit: int,
+    ) -> dict[str, Any]:
+        """Fetch the projected supply query, streaming out untracked stations."""
+        query_input = {"regionCode": NetworkRegion[self._network.name].value}
+        if "ebike_battery" in groups:
+            query_input["rideablePageLimit"] = page_limit
+
+        query = {
+            "query": (
+                GET_SUPPLY_QUERY
+                if groups >= set(DEFAULT_ATTRIBUTE_GROUPS)
+                else build_supply_query(groups)
+            ),
+            "variables": {"input": query_input},
+        }
+        return await fetch_supply_data(
+            async_get_clientsession(self._hass),
+            NetworkGraphQLEndpoints[self._network.name],
+            query,
+            tracked,
+            areas=areas,
+            metrics=self._metrics,
+            executor=self._hass.async_add_executor_job,
+        )
+
+    async def async_fetch_detail(
+        self,
+        site_ids: set[str],
+        groups: set[str],
+        page_limit: int,
+        on_stations: Callable[[list[dict[str, Any]]], None],
+    ) -> dict[str, Any]:
+        """Stream the full query for some stations with a rideable page limit."""
+        query = {
+            "query": build_supply_query(groups | {"ebike_battery"}),
+            "variables": {
+                "input": {
+                    "regionCode": NetworkRegion[self._network.name].value,
+                    "rideablePageLimit": page_limit,
+                }
+            },
+        }
+        return await fetch_supply_data(
+            async_get_clientsession(self._hass),
+            NetworkGraphQLEndpoints[self._network.name],
+            query,
+            site_ids,
+            executor=self._hass.async_add_executor_job,
+            on_stations=on_stations,
+        )
+
+
+class GBFSSupplySource(SupplySource):
+    """Poll the network's GBFS station feeds with conditional requests."""
+
+    name: ClassVar[str] = "gbfs"
+    # Station information is static, refetch it at most this often in seconds
+    INFORMATION_MIN_TTL: ClassVar[int] = 24 * 3600
+
+    def __init__(
+        self, hass: HomeAssistant, network: NetworkNames, metrics: FetchMetrics
+    ) -> None:
+        """Initialize the GBFS feeds."""
+        super().__init__(hass, network, metrics)
+        self._information = GBFSFeed(
+            f"{self.endpoint}station_information.json",
+            min_ttl=self.INFORMATION_MIN_TTL,
+        )
+        self._status = GBFSFeed(f"{self.endpoint}station_status.json")
+        self._stations: dict[str, dict[str, Any]] = {}
+
+    @property
+    def endpoint(self) -> str:
+        """Return the GBFS base URL of the network."""
+        return NetworkGBFSFeeds[self._network.name].value
+
+    async def async_fetch(
+        self,
+        groups: set[str],
+        tracked: set[str] | None,
+        areas: list[Area],
+        page_limit: int,
+    ) -> dict[str, Any]:
+        """Refresh the stale feeds and join the tracked stations."""
+        session = async_get_clientsession(self._hass)
+        executor = self._hass.async_add_executor_job
+        start = time.perf_counter()
+
+        result = await fetch_gbfs_feed(session, self._information, executor)
+        if result is FeedResult.FAILED and self._information.data is None:
+            return {"base": "cannot_connect"}
+        if result is FeedResult.UPDATED:
+            self._stations = {
+                station["station_id"]: station
+                for station in self._information.data.get("stations", [])
+            }
+        result = await fetch_gbfs_feed(session, self._status, executor)
+        if result is FeedResult.FAILED:
+            return {"base": "cannot_connect"}
+
+        statuses = self._status.data.get("stations", [])
+        self._metrics.request_ms = round((time.perf_counter() - start) * 1000, 1)
+        self._metrics.response_bytes = (
+            self._information.response_bytes + self._status.response_bytes
+        )
+        self._metrics.stations_seen = len(statuses)
+        # Feeds still within their ttl are not counted, no request was made
+        if result is FeedResult.NOT_MODIFIED:
+            self._metrics.not_modified += 1
+
+        stations = []
+        for status in statuses:
+            information = self._stations.get(status["station_id"])
+            if information is not None and self._is_tracked(
+                information, tracked, areas
+            ):
+                stations.append(self._to_supply_station(information, status, groups))
+        return {"data": {"supply": {"stations": stations}}}
+
+    @staticmethod
+    def _is_tracked(
+        information: dict[str, Any], tracked: set[str] | None, areas: list[Area]
+    ) -> bool:
+        """Return True if the station is tracked or inside an area."""
+        if tracked is None:
+            return True
+        if information.get("short_name") in tracked or information["name"] in tracked:
+            return True
+        return any(
+            haversine_km(
+                area.latitude, area.longitude, information["lat"], information["lon"]
+            )
+            <= area.radius_km
+            for area in areas
+        )
+
+    @staticmethod
+    def _to_supply_station(
+        information: dict[str, Any], status: dict[str, Any], groups: set[str]
+    ) -> dict[str, Any]:
+        """Map a GBFS station to a GraphQL station object."""
+        # GBFS counts e-bikes in num_bikes_available, GraphQL does not
+        bikes = status.get("num_bikes_available", 0)
+        ebikes = status.get("num_ebikes_available", 0)
+        station = {
+            "stationName": information["name"],
+            "siteId": information.get("short_name") or status["station_id"],
+            "lastUpdatedMs": status.get("last_reported", 0) * 1000,
+            "bikesAvailable": bikes - ebikes,
+            "ebikesAvailable": ebikes,
+            "isOffline": not (
+                status.get("is_installed", True) and status.get("is_renting", True)
+            ),
+            "totalRideablesAvailable": bikes,
+        }
+        # Records only carry the selected groups, per e-bike detail is not in GBFS
+        if "docks" in groups:
+            station["location"] = {
+                "lat": information["lat"],
+                "lng": information["lon"],
+            }
+            station["totalBikesAvailable"] = bikes
+            station["bikeDocksAvailable"] = status.get("num_docks_available", 0)
+        return station
+
+    async def async_fetch_detail(
+        self,
+        site_ids: set[str],
+        groups: set[str],
+        page_limit: int,
+        on_stations: Callable[[list[dict[str, Any]]], None],
+    ) -> dict[str, Any]:
+        """Return no stations, GBFS has no per e-bike detail."""
+        return {"data": {"supply": {"stations": []}}}
+
+
+SOURCES: dict[str, type[SupplySource]] = {
+    source.name: source for source in (GraphQLSupplySource, GBFSSupplySource)
+}
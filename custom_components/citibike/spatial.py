@@ -0,0 +1,189 @@
+"""Spatial index over station coordinates for Citibike integration."""
+
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+import heapq
+import math
+from typing import Any
+
+from .models import StationRecord
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Grid cell size in degrees, about 1.1 km north-south
+CELL_DEGREES = 0.01
+
+# Walk rings only while they cover at most this many cells per occupied cell,
+# beyond that the stations are scanned directly
+MAX_RING_CELLS_PER_OCCUPIED = 4
+
+
+@dataclass(slots=True, frozen=True)
+class IndexedStation:
+    """Station position stored in the index."""
+
+    name: str
+    site_id: str | None
+    lat: float
+    lon: float
+    search_key: str
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Return the great-circle distance between two points in kilometres."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class StationIndex:
+    """Grid bucket index answering nearest and radius station queries."""
+
+    def __init__(self, stations: list[IndexedStation]) -> None:
+        """Bucket the stations into grid cells."""
+        self._cells: dict[tuple[int, int], list[IndexedStation]] = defaultdict(list)
+        for station in stations:
+            self._cells[self._cell(station.lat, station.lon)].append(station)
+        self._size = len(stations)
+        if self._cells:
+            rows = [cell[0] for cell in self._cells]
+            cols = [cell[1] for cell in self._cells]
+            self._bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    def __len__(self) -> int:
+        """Return the number of indexed stations."""
+        return self._size
+
+    @classmethod
+    def from_stations(cls, stations: list[dict[str, Any]]) -> "StationIndex":
+        """Build an index from GraphQL station objects."""
+        return cls(
+            [
+                IndexedStation(
+                    name=station["stationName"],
+                    site_id=station.get("siteId"),
+                    lat=station["location"]["lat"],
+                    lon=station["location"]["lng"],
+                    search_key=station["stationName"].casefold(),
+                )
+                for station in stations
+                if station.get("location")
+            ]
+        )
+
+    @classmethod
+    def from_records(cls, records: Iterable[StationRecord]) -> "StationIndex":
+        """Build an index from station records that carry coordinates."""
+        return cls(
+            [
+                IndexedStation(
+                    name=record.name,
+                    site_id=record.site_id,
+                    lat=record.latitude,
+                    lon=record.longitude,
+                    search_key=record.name.casefold(),
+                )
+                for record in records
+                if record.latitude is not None and record.longitude is not None
+            ]
+        )
+
+    @staticmethod
+    def _cell(lat: float, lon: float) -> tuple[int, int]:
+        """Return the grid cell containing a point."""
+        return (math.floor(lat / CELL_DEGREES), math.floor(lon / CELL_DEGREES))
+
+    def _ring(self, center: tuple[int, int], radius: int):
+        """Yield the stations in the cells at a Chebyshev distance from center."""
+        row, col = center
+        for d_row in range(-radius, radius + 1):
+            step = 1 if abs(d_row) == radius else 2 * radius
+            for d_col in range(-radius, radius + 1, max(step, 1)):
+                yield from self._cells.get((row + d_row, col + d_col), ())
+
+    def _max_ring(self, center: tuple[int, int]) -> int:
+        """Return the ring that covers every occupied cell."""
+        min_row, max_row, min_col, max_col = self._bounds
+        return max(
+            abs(center[0] - min_row),
+            abs(center[0] - max_row),
+            abs(center[1] - min_col),
+            abs(center[1] - max_col),
+        )
+
+    def _scan_rings(self, center: tuple[int, int]) -> bool:
+        """Return True if walking the rings is cheaper than a linear scan."""
+        side = 2 * self._max_ring(center) + 1
+        return side * side <= MAX_RING_CELLS_PER_OCCUPIED * len(self._cells)
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        limit: int,
+        radius_km: float | None = None,
+        text: str | None = None,
+    ) -> list[tuple[float, IndexedStation]]:
+        """Return up to limit (distance, station) pairs closest to a point."""
+        if not self._size:
+            return []
+
+        needle = text.casefold() if text else None
+        center = self._cell(lat, lon)
+        best: list[tuple[float, int, IndexedStation]] = []
+
+        def consider(station: IndexedStation) -> None:
+            """Keep the station if it is among the nearest matches so far."""
+            if needle and needle not in station.search_key:
+                return
+            distance = haversine_km(lat, lon, station.lat, station.lon)
+            if radius_km is not None and distance > radius_km:
+                return
+            item = (-distance, id(station), station)
+            if len(best) < limit:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+
+        # Far from the network most rings are empty cells, scan the stations
+        if not self._scan_rings(center):
+            for cell in self._cells.values():
+                for station in cell:
+                    consider(station)
+            return self._sorted(best)
+
+        # Smallest extent of a cell, ring r lies at least r - 1 cells away
+        cell_km = (
+            math.radians(CELL_DEGREES)
+            * EARTH_RADIUS_KM
+            * max(math.cos(math.radians(min(abs(lat) + 1, 90))), 0.01)
+        )
+
+        for ring in range(self._max_ring(center) + 1):
+            floor_km = (ring - 1) * cell_km if ring else 0.0
+            if radius_km is not None and floor_km > radius_km:
+                break
+            if len(best) >= limit and floor_km > -best[0][0]:
+                break
+            for station in self._ring(center, ring):
+                consider(station)
+        return self._sorted(best)
+
+    @staticmethod
+    def _sorted(
+        best: list[tuple[float, int, IndexedStation]],
+    ) -> list[tuple[float, IndexedStation]]:
+        """Return the heap's (distance, station) pairs nearest first."""
+        return sorted(
+            ((-neg, station) for neg, _, station in best), key=lambda pair: pair[0]
+        )
+
+    def within(
+        self, lat: float, lon: float, radius_km: float
+    ) -> list[tuple[float, IndexedStation]]:
+        """Return every (distance, station) pair within a radius of a point."""
+        return self.nearest(lat, lon, self._size, radius_km=radius_km)
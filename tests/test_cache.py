@@ -0,0 +1,42 @@
+"""Tests for the Citibike caches."""
+
+from datetime import timedelta
+
+from custom_components.citibike.cache import SensorDataCache
+from custom_components.citibike.models import StationRecord
+
+_NETWORK = "TEST"
+
+
+def _records() -> list[StationRecord]:
+    """Return one station record."""
+    return [
+        StationRecord(
+            site_id="1",
+            name="W 21 St & 6 Ave",
+            last_updated_ms=0,
+            bikes_available=3,
+            ebikes_available=1,
+            is_offline=False,
+            total_rideables_available=4,
+        )
+    ]
+
+
+def test_invalidate_keeps_the_snapshot_as_fallback() -> None:
+    """An invalidated snapshot misses but stays available while the API is down."""
+    try:
+        SensorDataCache.set_timeout(_NETWORK, timedelta(minutes=5))
+        snapshot = SensorDataCache.update_cache(_NETWORK, _records())
+        assert SensorDataCache.get_cached_data(_NETWORK) is snapshot
+
+        SensorDataCache.invalidate(_NETWORK)
+        assert SensorDataCache.get_cached_data(_NETWORK) is None
+        assert SensorDataCache.get_last_snapshot(_NETWORK) is snapshot
+
+        # The next fetch sets the timeout again
+        SensorDataCache.set_timeout(_NETWORK, timedelta(minutes=5))
+        snapshot = SensorDataCache.update_cache(_NETWORK, _records())
+        assert SensorDataCache.get_cached_data(_NETWORK) is snapshot
+    finally:
+        SensorDataCache.evict(_NETWORK)
@@ -0,0 +1,116 @@
+"""Tests for the Citibike GraphQL response parsing."""
+
+import json
+
+import pytest
+
+from custom_components.citibike.areas import Area
+from custom_components.citibike.graphql_requests import SupplyStreamParser
+
+
+def _stations() -> list[dict]:
+    """Return stations with escapes, braces and non-ASCII text in their strings."""
+    return [
+        {
+            "stationName": 'W 21 St & 6 Ave "North" {A}',
+            "siteId": "1.01",
+            "location": {"lat": 40.7417, "lng": -73.9942},
+            "ebikesAvailable": 1,
+            "ebikes": [
+                {
+                    "rideableName": "···0042",
+                    "batteryStatus": {
+                        "percent": 80,
+                        "distanceRemaining": {"value": 21.5, "unit": "MILES"},
+                    },
+                }
+            ],
+        },
+        {
+            "stationName": "Café \\ Plaza ] [ , }",
+            "siteId": "2.02",
+            "location": {"lat": 40.80, "lng": -73.95},
+            "ebikesAvailable": 0,
+            "ebikes": [],
+        },
+        {
+            "stationName": "Bergen St → Smith St \U0001f6b2",
+            "siteId": "3.03",
+            "location": {"lat": 40.6861, "lng": -73.9906},
+            "ebikesAvailable": 0,
+            "ebikes": [],
+        },
+    ]
+
+
+def _body(stations: list[dict]) -> bytes:
+    """Return a GetSupply response body holding the stations."""
+    payload = {"data": {"supply": {"stations": stations, "rideables": []}}}
+    return json.dumps(payload, ensure_ascii=False, indent=1).encode()
+
+
+def _parse(parser: SupplyStreamParser, body: bytes, size: int) -> list[dict]:
+    """Feed the body in chunks of a given size and return the kept stations."""
+    stations = []
+    for offset in range(0, len(body), size):
+        stations.extend(parser.feed(body[offset : offset + size]))
+    return stations
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1 << 20])
+def test_parser_matches_a_full_decode(size: int) -> None:
+    """Chunks split anywhere, even inside a character, give the same stations."""
+    body = _body(_stations())
+    parser = SupplyStreamParser()
+    assert _parse(parser, body, size) == json.loads(body)["data"]["supply"]["stations"]
+    assert parser.done
+    assert parser.seen == 3
+
+
+def test_parser_keeps_tracked_stations() -> None:
+    """Stations are kept by siteId, by name or by lying inside an area."""
+    body = _body(_stations())
+    parser = SupplyStreamParser(
+        {"1.01", "Café \\ Plaza ] [ , }"}, [Area(40.6861, -73.9906, 0.1)]
+    )
+    kept = _parse(parser, body, 5)
+    assert [station["siteId"] for station in kept] == ["1.01", "2.02", "3.03"]
+
+    parser = SupplyStreamParser({"2.02"})
+    assert [station["siteId"] for station in _parse(parser, body, 5)] == ["2.02"]
+    assert parser.seen == 3
+
+    parser = SupplyStreamParser(set(), [Area(0.0, 0.0, 1.0)])
+    assert _parse(parser, body, 5) == []
+    assert parser.done
+
+
+def test_parser_handles_an_empty_station_list() -> None:
+    """An empty list completes without stations."""
+    parser = SupplyStreamParser()
+    assert parser.feed(b'{"data": {"supply": {"stations": []}}}') == []
+    assert parser.done
+    assert parser.seen == 0
+
+
+def test_parser_waits_for_a_truncated_body() -> None:
+    """A body cut off inside the list is not done."""
+    body = _body(_stations())
+    parser = SupplyStreamParser()
+    stations = parser.feed(body[: body.index(b'"3.03"')])
+    assert [station["siteId"] for station in stations] == ["1.01", "2.02"]
+    assert not parser.done
+
+
+def test_parser_without_a_station_list() -> None:
+    """A body without a station list is never done."""
+    parser = SupplyStreamParser()
+    assert _parse(parser, b'{"errors": [{"message": "boom"}]}' * 10, 4) == []
+    assert not parser.done
+
+
+def test_parser_rejects_a_malformed_list() -> None:
+    """Anything but objects in the station list is an error."""
+    parser = SupplyStreamParser()
+    with pytest.raises(ValueError):
+        parser.feed(b'{"data": {"supply": {"stations": [1, 2]}}}')
@@ -0,0 +1,137 @@
+"""Tests for the Citibike station history and forecast."""
+
+from custom_components.citibike.history import (
+    HISTORY_SAMPLES,
+    StationHistory,
+)
+from custom_components.citibike.models import StationRecord
+
+_MINUTE_MS = 60_000
+
+
+def _record(
+    updated_ms: int, bikes: int, ebikes: int = 0, docks: int | None = 10
+) -> StationRecord:
+    """Return a station record with the given counts."""
+    return StationRecord(
+        site_id="1",
+        name="W 21 St & 6 Ave",
+        last_updated_ms=updated_ms,
+        bikes_available=bikes,
+        ebikes_available=ebikes,
+        is_offline=False,
+        total_rideables_available=bikes + ebikes,
+        docks_available=docks,
+    )
+
+
+def _history(samples: list[tuple[int, int, int, int | None]]) -> StationHistory:
+    """Return a history holding (updated_ms, bikes, ebikes, docks) samples."""
+    history = StationHistory()
+    for sample in samples:
+        assert history.append(_record(*sample))
+    return history
+
+
+def test_forecast_needs_two_samples() -> None:
+    """A single report gives no forecast."""
+    history = _history([(0, 5, 0, 5)])
+    assert history.forecast(now_ms=0) is None
+
+
+def test_forecast_ignores_trend_over_a_short_window() -> None:
+    """Two reports seconds apart do not extrapolate a trend."""
+    history = _history([(0, 5, 0, 5), (4_000, 6, 0, 4)])
+    forecast = history.forecast(now_ms=4_000)
+    assert forecast.bikes == 6
+    assert forecast.docks == 4
+    assert forecast.trend_per_hour is None
+
+
+def test_forecast_ignores_trend_from_two_samples() -> None:
+    """Two reports minutes apart are too few to fit a trend."""
+    history = _history([(0, 2, 0, 8), (5 * _MINUTE_MS, 8, 0, 2)])
+    forecast = history.forecast(now_ms=5 * _MINUTE_MS)
+    assert forecast.bikes == 8
+    assert forecast.docks == 2
+
+
+def test_forecast_follows_a_steady_trend() -> None:
+    """A trend over the horizon is extrapolated and docks follow the bikes."""
+    history = _history(
+        [
+            (minute * _MINUTE_MS, minute // 5, 0, 20 - minute // 5)
+            for minute in range(31)
+        ]
+    )
+    forecast = history.forecast(now_ms=30 * _MINUTE_MS)
+    assert 8.5 <= forecast.bikes <= 9.5
+    assert forecast.docks == round(20 - forecast.bikes, 1)
+    assert forecast.trend_per_hour > 0
+
+
+def test_forecast_is_clamped_to_capacity() -> None:
+    """A trend never forecasts more bikes than the station holds or fewer than 0."""
+    filling = _history(
+        [
+            (minute * _MINUTE_MS, minute // 2, minute // 2, 16 - minute // 2 * 2)
+            for minute in range(16)
+        ]
+    )
+    forecast = filling.forecast(now_ms=15 * _MINUTE_MS)
+    assert forecast.bikes + forecast.ebikes == 16
+    assert forecast.docks == 0
+
+    emptying = _history(
+        [(minute * _MINUTE_MS, 20 - minute, 0, minute) for minute in range(20)]
+    )
+    forecast = emptying.forecast(now_ms=19 * _MINUTE_MS)
+    assert forecast.bikes == 0
+    assert forecast.docks == 20
+
+
+def test_forecast_without_docks() -> None:
+    """Stations without dock counts are only clamped at zero."""
+    history = _history(
+        [(minute * _MINUTE_MS, minute, 0, None) for minute in range(20)]
+    )
+    forecast = history.forecast(now_ms=19 * _MINUTE_MS)
+    assert forecast.docks is None
+    assert forecast.bikes > 19
+
+
+def test_append_skips_stale_reports() -> None:
+    """A report not newer than the last sample is not appended."""
+    history = _history([(1_000, 1, 0, 9)])
+    assert not history.append(_record(1_000, 2))
+    assert not history.append(_record(500, 2))
+    assert len(history) == 1
+
+
+def test_ring_wraps_around() -> None:
+    """Once full the oldest samples are overwritten and order is kept."""
+    total = HISTORY_SAMPLES + 10
+    history = _history([(step, step % 7, 0, 10) for step in range(1, total + 1)])
+    assert len(history) == HISTORY_SAMPLES
+    assert history.last_updated_ms == total
+    times = list(history._ordered(history._updated_ms))
+    assert times == list(range(11, total + 1))
+    assert list(history._ordered(history._bikes)) == [t % 7 for t in times]
+
+
+def test_round_trip() -> None:
+    """A history restored from to_dict matches the original."""
+    for total in (0, 5, HISTORY_SAMPLES + 3):
+        history = StationHistory()
+        for step in range(1, total + 1):
+            history.append(_record(step * _MINUTE_MS, step % 9, step % 3, None))
+        restored = StationHistory.from_dict(history.to_dict())
+        assert len(restored) == len(history)
+        assert restored.last_updated_ms == history.last_updated_ms
+        assert restored.to_dict() == history.to_dict()
+        now_ms = total * _MINUTE_MS
+        assert restored.forecast(now_ms=now_ms) == history.forecast(now_ms=now_ms)
+        if total:
+            # Appending after a restore continues the ring in order
+            restored.append(_record(now_ms + _MINUTE_MS, 1))
+            assert restored.last_updated_ms == now_ms + _MINUTE_MS
@@ -0,0 +1,50 @@
+"""Tests for the Citibike rideable change feed."""
+
+from custom_components.citibike.models import RideableRecord
+from custom_components.citibike.rideables import (
+    ARRIVED,
+    BATTERY_CHANGED,
+    DEPARTED,
+    RideableChange,
+    diff_rideables,
+)
+
+
+def _ebike(
+    name: str, battery: int = 80, distance: float = 20.0, unit: str = "MILES"
+) -> RideableRecord:
+    """Return an e-bike record."""
+    return RideableRecord(name, battery, distance, unit)
+
+
+def test_diff_unchanged() -> None:
+    """Identical lists give no changes."""
+    ebikes = (_ebike("...0001"), _ebike("...0002"))
+    assert diff_rideables(ebikes, ebikes) == []
+    assert diff_rideables(ebikes, tuple(reversed(ebikes))) == []
+
+
+def test_diff_arrived_departed_and_battery_changed() -> None:
+    """Each e-bike gives at most one change, departures last."""
+    before = (_ebike("...0001", 40), _ebike("...0002", 90), _ebike("...0003"))
+    after = (_ebike("...0002", 90), _ebike("...0001", 55), _ebike("...0004", 30))
+    changes = diff_rideables(before, after)
+    assert [(change.change, change.rideable.name) for change in changes] == [
+        (BATTERY_CHANGED, "...0001"),
+        (ARRIVED, "...0004"),
+        (DEPARTED, "...0003"),
+    ]
+    assert changes[0].previous == before[0]
+    assert changes[1].previous is None
+
+
+def test_passes_compares_range_in_miles() -> None:
+    """The range threshold is in miles whatever unit the API reports."""
+    kilometres = RideableChange(ARRIVED, _ebike("...0001", 50, 16.0, "KILOMETERS"))
+    assert kilometres.passes(50, 9.9)
+    assert not kilometres.passes(50, 10.0)
+    assert not kilometres.passes(51, 0)
+
+    miles = RideableChange(ARRIVED, _ebike("...0002", 50, 10.0))
+    assert miles.passes(0, 10.0)
+    assert not miles.passes(0, 10.1)
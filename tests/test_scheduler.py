@@ -0,0 +1,233 @@
+"""Tests for the Citibike poll scheduling and request budget."""
+
+import asyncio
+from datetime import datetime, time, timedelta
+import random
+
+import pytest
+
+from custom_components.citibike import scheduler
+from custom_components.citibike.scheduler import (
+    QUIET_SCAN_INTERVAL,
+    AdaptivePollScheduler,
+    RequestBudget,
+    in_quiet_hours,
+)
+
+DEFAULT_INTERVAL = timedelta(minutes=5)
+
+
+def _simulate_week(report_every: timedelta, seed: int) -> list[float]:
+    """Poll stations reporting at a fixed period for a week, returning minutes."""
+    rng = random.Random(seed)
+    random.seed(seed)
+    period = report_every.total_seconds()
+    phases = [rng.uniform(0, period) for _ in range(300)]
+    poll_scheduler = AdaptivePollScheduler("TEST", DEFAULT_INTERVAL)
+    start = datetime(2026, 1, 5)
+    elapsed = 0.0
+    intervals = []
+    while elapsed < timedelta(days=7).total_seconds():
+        # Each station last reported at its phase plus a whole number of periods
+        poll_scheduler.observe(
+            start + timedelta(seconds=elapsed),
+            {
+                str(number): int((elapsed - (elapsed - phase) % period) * 1000)
+                for number, phase in enumerate(phases)
+            },
+        )
+        interval = poll_scheduler.next_interval(False)
+        intervals.append(interval.total_seconds() / 60)
+        elapsed += interval.total_seconds()
+    return intervals
+
+
+@pytest.mark.parametrize(
+    ("report_every", "low", "high"),
+    [
+        (timedelta(seconds=30), 2.7, 3.3),
+        (timedelta(minutes=10), 5.0, 7.0),
+        (timedelta(hours=1), 9.0, 11.0),
+    ],
+)
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_interval_follows_the_cadence(
+    report_every: timedelta, low: float, high: float, seed: int
+) -> None:
+    """Once warmed up the interval settles in a band set by the cadence."""
+    intervals = _simulate_week(report_every, seed)
+    settled = intervals[20:]
+    assert low <= min(settled)
+    assert max(settled) <= high
+
+
+def test_interval_defaults_without_observations() -> None:
+    """The first interval is the jittered default."""
+    poll_scheduler = AdaptivePollScheduler("TEST", DEFAULT_INTERVAL)
+    assert poll_scheduler.cadence is None
+    for _ in range(50):
+        interval = poll_scheduler.next_interval(False)
+        assert DEFAULT_INTERVAL * 0.9 <= interval <= DEFAULT_INTERVAL * 1.1
+
+
+def test_observe_skips_cached_snapshots() -> None:
+    """A snapshot whose fetch timestamp did not advance is not counted."""
+    poll_scheduler = AdaptivePollScheduler("TEST", DEFAULT_INTERVAL)
+    fetched = datetime(2026, 1, 5)
+    poll_scheduler.observe(fetched, {"1": 0, "2": 0})
+    poll_scheduler.observe(fetched, {"1": 1, "2": 1})
+    assert poll_scheduler.cadence is None
+
+    poll_scheduler.observe(fetched + timedelta(minutes=5), {"1": 1, "2": 0})
+    # One of two stations changed in 5 minutes: 300 / ln(2) seconds
+    assert poll_scheduler.cadence.total_seconds() == pytest.approx(432.8, abs=0.1)
+
+
+def test_cadence_is_bounded_when_nothing_or_everything_changed() -> None:
+    """No change or a full change still gives a finite cadence."""
+    fetched = datetime(2026, 1, 5)
+    still = AdaptivePollScheduler("TEST", DEFAULT_INTERVAL)
+    busy = AdaptivePollScheduler("TEST", DEFAULT_INTERVAL)
+    for poll in range(3):
+        moment = fetched + timedelta(minutes=5 * poll)
+        still.observe(moment, {"1": 0, "2": 0})
+        busy.observe(moment, {"1": poll, "2": poll})
+    assert timedelta(minutes=15) < still.cadence < timedelta(days=1)
+    assert timedelta(0) < busy.cadence < timedelta(minutes=5)
+
+
+def test_quiet_interval() -> None:
+    """Quiet hours poll at the quiet interval."""
+    poll_scheduler = AdaptivePollScheduler("TEST", DEFAULT_INTERVAL)
+    interval = poll_scheduler.next_interval(True)
+    assert QUIET_SCAN_INTERVAL * 0.9 <= interval <= QUIET_SCAN_INTERVAL * 1.1
+
+
+@pytest.mark.parametrize(
+    ("now", "start", "end", "expected"),
+    [
+        (time(3, 0), time(1, 0), time(6, 0), True),
+        (time(6, 0), time(1, 0), time(6, 0), False),
+        (time(0, 59), time(1, 0), time(6, 0), False),
+        (time(23, 30), time(23, 0), time(6, 0), True),
+        (time(0, 0), time(23, 0), time(6, 0), True),
+        (time(5, 59), time(23, 0), time(6, 0), True),
+        (time(12, 0), time(23, 0), time(6, 0), False),
+        (time(22, 59), time(23, 0), time(6, 0), False),
+        (time(3, 0), time(3, 0), time(3, 0), False),
+        (time(3, 0), None, time(6, 0), False),
+        (time(3, 0), time(1, 0), None, False),
+    ],
+)
+def test_in_quiet_hours(
+    now: time, start: time | None, end: time | None, expected: bool
+) -> None:
+    """Quiet windows include their start, exclude their end and may wrap."""
+    assert in_quiet_hours(now, start, end) is expected
+
+
+async def _hold(budget: RequestBudget, release: asyncio.Event) -> None:
+    """Hold a slot until released."""
+    async with budget.slot("HOLD", 0):
+        await release.wait()
+
+
+async def _take(budget: RequestBudget, name: str, priority: float, order: list):
+    """Take a slot and record the order it was granted in."""
+    async with budget.slot(name, priority):
+        order.append(name)
+
+
+def test_budget_grants_slots_by_priority() -> None:
+    """Queued requests are served highest priority first, then by arrival."""
+
+    async def run() -> list[str]:
+        budget = RequestBudget(concurrency=1, per_minute=100)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(budget, release))
+        await asyncio.sleep(0)
+        order = []
+        tasks = [
+            asyncio.create_task(_take(budget, name, priority, order))
+            for name, priority in (("low", 1), ("high", 5), ("mid", 3), ("mid2", 3))
+        ]
+        await asyncio.sleep(0)
+        assert budget.queued == 4
+        release.set()
+        await asyncio.gather(holder, *tasks)
+        assert budget.queued == 0
+        return order
+
+    assert asyncio.run(run()) == ["high", "mid", "mid2", "low"]
+
+
+def test_budget_cancelling_a_queued_request() -> None:
+    """A cancelled waiter leaves the queue and the next one still gets served."""
+
+    async def run() -> list[str]:
+        budget = RequestBudget(concurrency=1, per_minute=100)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(budget, release))
+        await asyncio.sleep(0)
+        order = []
+        first = asyncio.create_task(_take(budget, "first", 5, order))
+        second = asyncio.create_task(_take(budget, "second", 1, order))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert budget.queued == 1
+        release.set()
+        await asyncio.wait_for(asyncio.gather(holder, second), 1)
+        assert budget.queued == 0
+        return order
+
+    assert asyncio.run(run()) == ["second"]
+
+
+def test_budget_cancelling_the_first_waiter_wakes_the_next() -> None:
+    """A woken head of the queue cancelled before it runs hands the slot on."""
+
+    async def run() -> list[str]:
+        budget = RequestBudget(concurrency=1, per_minute=100)
+        held = budget.slot("HOLD", 0)
+        await held.__aenter__()
+        order = []
+        first = asyncio.create_task(_take(budget, "first", 5, order))
+        second = asyncio.create_task(_take(budget, "second", 1, order))
+        await asyncio.sleep(0)
+        # Freeing the slot wakes the first waiter, which is cancelled before it runs
+        await held.__aexit__(None, None, None)
+        first.cancel()
+        await asyncio.wait_for(second, 1)
+        assert first.cancelled()
+        assert budget.queued == 0
+        return order
+
+    assert asyncio.run(run()) == ["second"]
+
+
+def test_budget_caps_requests_per_minute(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Requests beyond the per-minute cap wait until the oldest is a minute old."""
+    clock = [1000.0]
+    sleep = asyncio.sleep
+
+    async def fake_sleep(delay: float) -> None:
+        clock[0] += delay
+        await sleep(0)
+
+    monkeypatch.setattr(scheduler.monotonic_time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(scheduler.asyncio, "sleep", fake_sleep)
+
+    async def run() -> list[float]:
+        budget = RequestBudget(concurrency=5, per_minute=2)
+        granted = []
+
+        async def take() -> None:
+            async with budget.slot("TEST", 0):
+                granted.append(clock[0])
+
+        await asyncio.gather(*(take() for _ in range(5)))
+        return granted
+
+    assert asyncio.run(run()) == [1000.0, 1000.0, 1060.0, 1060.0, 1120.0]
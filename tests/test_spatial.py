@@ -0,0 +1,64 @@
+"""Tests for the Citibike station index."""
+
+import random
+import time
+
+from custom_components.citibike.spatial import (
+    IndexedStation,
+    StationIndex,
+    haversine_km,
+)
+
+
+def _stations(count: int) -> list[IndexedStation]:
+    """Return stations scattered over the New York City area."""
+    rng = random.Random(7)
+    stations = []
+    for number in range(count):
+        lat = rng.uniform(40.60, 40.88)
+        lon = rng.uniform(-74.05, -73.85)
+        name = f"Station {number}"
+        stations.append(IndexedStation(name, str(number), lat, lon, name.casefold()))
+    return stations
+
+
+def _brute_force(stations, lat, lon, limit):
+    """Return the nearest stations by scanning every one."""
+    return sorted(
+        (haversine_km(lat, lon, station.lat, station.lon), station.name)
+        for station in stations
+    )[:limit]
+
+
+def test_nearest_matches_brute_force_near_the_network() -> None:
+    """Nearest stations from inside the network match a full scan."""
+    stations = _stations(2000)
+    index = StationIndex(stations)
+    result = index.nearest(40.75, -73.98, 50)
+    assert [(round(d, 9), s.name) for d, s in result] == [
+        (round(d, 9), name) for d, name in _brute_force(stations, 40.75, -73.98, 50)
+    ]
+
+
+def test_nearest_far_from_the_network_is_fast_and_exact() -> None:
+    """A query point across the continent neither hangs nor misses stations."""
+    stations = _stations(2000)
+    index = StationIndex(stations)
+    for lat, lon in ((37.77, -122.42), (42.36, -71.06)):
+        start = time.perf_counter()
+        result = index.nearest(lat, lon, 50)
+        assert time.perf_counter() - start < 0.5
+        assert [s.name for _, s in result] == [
+            name for _, name in _brute_force(stations, lat, lon, 50)
+        ]
+
+
+def test_within_radius() -> None:
+    """Only stations inside the radius are returned."""
+    stations = _stations(500)
+    index = StationIndex(stations)
+    result = index.within(40.75, -73.98, 1.0)
+    assert all(distance <= 1.0 for distance, _ in result)
+    assert len(result) == sum(
+        haversine_km(40.75, -73.98, s.lat, s.lon) <= 1.0 for s in stations
+    )